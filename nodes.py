@@ -1,5 +1,6 @@
 import os
 import io
+import re
 import json
 import uuid
 import numpy as np
@@ -8,120 +9,1119 @@ import torch
 from PIL import Image
 import websocket
 import base64
+import fal_client
+import replicate
+import zlib
+import struct
+import folder_paths
+import comfy.utils
+import comfy.model_management
+from server import PromptServer
+from comfy.cli_args import args
+from xml.sax.saxutils import escape
+import threading
+import time
+import gzip
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+# Shared helpers
+
+def sniff_image_format(data):
+    """Guess the container format of downloaded image bytes from their magic number."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "bin"
+
+def cloud_image_bytes(data, provider, endpoint, url, **metadata):
+    """Wrap the untouched provider download so it can be saved without a decode/re-encode pass."""
+    metadata.update({"provider": provider, "endpoint": endpoint, "url": url})
+    return {"data": data, "format": sniff_image_format(data), "metadata": metadata}
+
+OUTPUT_FORMATS = ["png", "webp", "jpeg"]
+
+def output_format_args(provider, output_format, output_quality):
+    """Map the shared output_format/output_quality widgets onto each provider's own parameters."""
+    if provider == "replicate":
+        return {"output_format": {"jpeg": "jpg"}.get(output_format, output_format), "output_quality": output_quality}
+    if provider == "runware":
+        return {"outputFormat": {"jpeg": "JPG"}.get(output_format, output_format.upper()), "outputQuality": output_quality} #clamped by the endpoint schema
+    #fal flux endpoints only offer png and jpeg, so webp falls back to the smaller of the two
+    return {"output_format": "png" if output_format == "png" else "jpeg"}
+
+def decode_image(data):
+    """Decode PNG, WEBP or JPEG bytes into a comfy IMAGE tensor."""
+    image = Image.open(io.BytesIO(data))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image = np.array(image).astype(np.float32) / 255.0
+    return torch.from_numpy(image)[None,]
+
+def result_image_bytes(image):
+    """Get the bytes of a result image, which realtime and streamed results inline instead of hosting a file."""
+    url = image["url"]
+    if url.startswith("data:"):
+        return base64.b64decode(url.split(",", 1)[1])
+    return transport.get(url)
+
+def png_text_chunk(keyword, text):
+    body = keyword.encode("latin-1") + b"\0" + text.encode("latin-1")
+    return struct.pack(">I", len(body)) + b"tEXt" + body + struct.pack(">I", zlib.crc32(b"tEXt" + body) & 0xffffffff)
+
+def xmp_packet(fields):
+    properties = "".join(f"<comfy:{key}>{escape(text)}</comfy:{key}>" for key, text in fields.items())
+    return ('<?xpacket begin="\ufeff" id="W5M0MpCehiHzreSzNTczkc9d"?><x:xmpmeta xmlns:x="adobe:ns:meta/">'
+            '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+            f'<rdf:Description rdf:about="" xmlns:comfy="https://github.com/comfyanonymous/ComfyUI">{properties}</rdf:Description>'
+            '</rdf:RDF></x:xmpmeta><?xpacket end="w"?>').encode("utf-8")
+
+def embed_metadata(data, image_format, fields):
+    """Splice text metadata into encoded image bytes without touching the image data.
+
+    PNG gets tEXt chunks, JPEG an XMP APP1 segment and WEBP an XMP chunk. Returns the bytes unchanged
+    (with a warning) when the container can't take it.
+    """
+    if image_format == "png":
+        iend = data.rfind(b"IEND") - 4
+        if iend < 0:
+            print("Cloud image has no IEND chunk, saving it without metadata")
+            return data
+        return data[:iend] + b"".join(png_text_chunk(key, text) for key, text in fields.items()) + data[iend:]
+    if image_format == "jpeg":
+        xmp = b"http://ns.adobe.com/xap/1.0/\0" + xmp_packet(fields)
+        if len(xmp) > 65533:
+            #a single APP1 segment is capped at 64KB, large workflows don't fit
+            print("Metadata is too large for a JPEG XMP segment, saving it without metadata")
+            return data
+        insert = 2
+        if data[2:4] == b"\xff\xe0": #keep the JFIF header first
+            insert = 4 + struct.unpack(">H", data[4:6])[0]
+        return data[:insert] + b"\xff\xe1" + struct.pack(">H", len(xmp) + 2) + xmp + data[insert:]
+    if image_format == "webp":
+        chunks = data[12:]
+        if chunks[:4] == b"VP8X":
+            header, rest = chunks[:8] + bytes([chunks[8] | 0x04]) + chunks[9:18], chunks[18:]
+        else:
+            #simple VP8/VP8L files need the extended header before they can carry metadata
+            image = Image.open(io.BytesIO(data))
+            flags = 0x04 | (0x10 if image.mode == "RGBA" else 0)
+            header = b"VP8X" + struct.pack("<I", 10) + bytes([flags, 0, 0, 0]) + (image.width - 1).to_bytes(3, "little") + (image.height - 1).to_bytes(3, "little")
+            rest = chunks
+        xmp = xmp_packet(fields)
+        body = b"WEBP" + header + rest + b"XMP " + struct.pack("<I", len(xmp)) + xmp + b"\0" * (len(xmp) % 2)
+        return b"RIFF" + struct.pack("<I", len(body)) + body
+    return data
+
+# Transport
+
+VOLATILE_FIELDS = ("apiKey", "taskUUID")
+
+def scrub(value):
+    """Drop secrets and per-call random ids so recorded requests match again on replay."""
+    if isinstance(value, dict):
+        return {k: scrub(v) for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [scrub(v) for v in value]
+    if isinstance(value, bytes):
+        return {"sha1": hashlib.sha1(value).hexdigest(), "size": len(value)}
+    if isinstance(value, str) and value.startswith("data:"):
+        #inline base64 images (runware uploads and seed images) are keyed by hash instead of stored
+        return {"sha1": hashlib.sha1(value.encode('utf-8')).hexdigest(), "size": len(value)}
+    return value
+
+def encode_value(value):
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode('utf-8')}
+    if isinstance(value, dict):
+        return {k: encode_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_value(v) for v in value]
+    return value
+
+def decode_value(value):
+    if isinstance(value, dict):
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+        return {k: decode_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    return value
+
+class Transport:
+    """Every provider call goes through here so it can run live, be recorded to a cassette, or be replayed from one.
+
+    Set with environment variables:
+        CLOUD_API_TRANSPORT   live (default), record or replay
+        CLOUD_API_CASSETTE    cassette path, defaults to cassettes/default.jsonl.gz next to this file
+        CLOUD_API_TIME_SCALE  multiplier on recorded latencies during replay, 0 replays instantly
+        CLOUD_API_REPLAY_LOOSE  1 to let a request with no exact match take the next recorded call of the same kind
+    """
+    def __init__(self, mode="live", cassette=None, time_scale=1.0, loose=False):
+        if mode not in ("live", "record", "replay"):
+            raise ValueError(f"Unknown transport mode {mode}. Expected live, record or replay.")
+        self.mode = mode
+        self.cassette = cassette or os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes", "default.jsonl.gz")
+        self.time_scale = time_scale
+        self.loose = loose
+        self.lock = threading.Lock()
+        self.by_key = None
+        self.by_kind = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.environ.get("CLOUD_API_TRANSPORT", "live"),
+            os.environ.get("CLOUD_API_CASSETTE"),
+            float(os.environ.get("CLOUD_API_TIME_SCALE", "1")),
+            os.environ.get("CLOUD_API_REPLAY_LOOSE") == "1",
+        )
+
+    def request_key(self, kind, request):
+        return kind + ":" + hashlib.sha1(json.dumps(request, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def write(self, entry):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.cassette), exist_ok=True)
+            #each append is its own gzip member, which gzip readers concatenate transparently
+            with gzip.open(self.cassette, 'at', encoding='utf-8') as file:
+                file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def load(self):
+        self.by_key, self.by_kind = {}, {}
+        with gzip.open(self.cassette, 'rt', encoding='utf-8') as file:
+            for line in file:
+                entry = json.loads(line)
+                entry["used"] = False
+                self.by_key.setdefault(entry["key"], deque()).append(entry)
+                self.by_kind.setdefault(entry["kind"], deque()).append(entry)
+
+    def take(self, kind, key):
+        #exact request match only, unless loose replay allows the next unused call of the same kind
+        with self.lock:
+            if self.by_key is None:
+                self.load()
+            queues = [self.by_key.get(key)]
+            if self.loose:
+                queues.append(self.by_kind.get(kind))
+            for queue in queues:
+                while queue and queue[0]["used"]:
+                    queue.popleft()
+                if queue:
+                    entry = queue.popleft()
+                    entry["used"] = True
+                    return entry
+        raise LookupError(f"Cassette {self.cassette} has no recorded {kind} call matching this request left to replay.")
+
+    def call(self, kind, request, live):
+        """Run live() for a provider call identified by kind and request, recording or replaying it as configured."""
+        if self.mode == "live":
+            return live()
+        request = scrub(request)
+        key = self.request_key(kind, request)
+        if self.mode == "replay":
+            entry = self.take(kind, key)
+            time.sleep(entry["elapsed"] * self.time_scale)
+            if "error" in entry:
+                raise RuntimeError(entry["error"])
+            return decode_value(entry["response"])
+        start = time.perf_counter()
+        try:
+            response = live()
+        except Exception as e:
+            self.write({"kind": kind, "key": key, "request": request, "elapsed": time.perf_counter() - start, "error": f"{type(e).__name__}: {e}"})
+            raise
+        self.write({"kind": kind, "key": key, "request": request, "elapsed": time.perf_counter() - start, "response": encode_value(response)})
+        return response
+
+    def stream(self, kind, request, live):
+        """Like call() for event streams, keeping each event's offset so replay paces them like the original."""
+        if self.mode == "live":
+            yield from live()
+            return
+        request = scrub(request)
+        key = self.request_key(kind, request)
+        if self.mode == "replay":
+            entry = self.take(kind, key)
+            previous = 0.0
+            for offset, event in entry["events"]:
+                time.sleep((offset - previous) * self.time_scale)
+                previous = offset
+                yield decode_value(event)
+            return
+        start = time.perf_counter()
+        events = []
+        try:
+            for event in live():
+                events.append([time.perf_counter() - start, encode_value(event)])
+                yield event
+        finally:
+            #a stream stopped early is still worth replaying up to where it was cut
+            self.write({"kind": kind, "key": key, "request": request, "elapsed": time.perf_counter() - start, "events": events})
+
+    def get(self, url):
+        return self.call("http.get", {"url": url}, lambda: requests.get(url).content)
+
+    def head(self, url):
+        def live():
+            response = requests.head(url, allow_redirects=True, timeout=10)
+            return {
+                "status": response.status_code,
+                "content_type": response.headers.get("Content-Type", ""),
+                "size": int(response.headers.get("Content-Length") or 0),
+            }
+        return self.call("http.head", {"url": url}, live)
+
+    def post_json(self, url, headers, payload):
+        def live():
+            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response.raise_for_status()
+            return response.json()
+        return self.call("http.post", {"url": url, "json": payload}, live)
+
+    def fal_upload(self, data, content_type):
+        return self.call("fal.upload", {"data": data, "content_type": content_type}, lambda: fal_client.upload(data, content_type))
+
+    def fal_run(self, endpoint, arguments, on_submit=None):
+        def live():
+            handle = fal_client.submit(endpoint, arguments=arguments)
+            if on_submit is not None:
+                on_submit(handle)
+            return handle.get()
+        return self.call("fal.run", {"endpoint": endpoint, "arguments": arguments}, live)
+
+    def fal_stream(self, endpoint, arguments):
+        return self.stream("fal.stream", {"endpoint": endpoint, "arguments": arguments}, lambda: fal_client.stream(endpoint, arguments=arguments))
+
+    def replicate_run(self, model, input):
+        def live():
+            output = replicate.run(model, input=input)
+            #file outputs are objects in newer replicate clients, keep just their urls
+            return [str(o) for o in output] if isinstance(output, list) else str(output)
+        return self.call("replicate.run", {"model": model, "input": input}, live)
+
+    def websocket(self, url, **kwargs):
+        return TransportWebSocket(self, url, **kwargs)
+
+class TransportWebSocket:
+    """websocket-client stand-in that records each received message against the message sent before it."""
+    def __init__(self, transport, url, **kwargs):
+        self.transport = transport
+        self.url = url.split("?", 1)[0] #query strings carry auth tokens
+        self.sent = None
+        self.ws = None
+        def connect():
+            #only the elapsed time is kept, so replay still pays for the connect and TLS handshake
+            self.ws = websocket.create_connection(url, **kwargs)
+        transport.call("websocket.connect", {"url": self.url}, connect)
+
+    @property
+    def connected(self):
+        return self.ws.connected if self.ws is not None else True
+
+    def send(self, payload):
+        self.sent = payload
+        if self.ws is not None:
+            self.ws.send(payload)
+
+    def recv(self):
+        try:
+            sent = json.loads(self.sent)
+        except (TypeError, ValueError):
+            sent = self.sent
+        return self.transport.call("websocket.recv", {"url": self.url, "sent": sent}, self.ws.recv if self.ws is not None else None)
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+transport = Transport.from_env()
+
+# fal realtime
+
+FAL_TOKEN_URL = "https://rest.alpha.fal.ai/tokens/"
+
+class FalRealtimeSession:
+    """Persistent websocket to a fal realtime app, kept open between prompts so each request skips the queue."""
+    def __init__(self, app, key):
+        self.app = app
+        self.key = key
+        self.ws = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        #FAL_REALTIME_URL points the session at a local stand-in server (see tools/fal_realtime_stub.py)
+        url = os.environ.get("FAL_REALTIME_URL")
+        if not url:
+            token = transport.post_json(
+                FAL_TOKEN_URL,
+                {"Authorization": f"Key {self.key}"},
+                {"allowed_apps": [self.app.split("/")[1]], "token_expiration": 120},
+            )
+            url = f"wss://fal.run/{self.app}/realtime?fal_jwt_token={token}"
+        self.ws = transport.websocket(url, timeout=60)
+
+    def close(self):
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+        self.ws = None
+
+    def generate(self, arguments):
+        with self.lock:
+            for attempt in range(2):
+                sent = replied = False
+                try:
+                    if self.ws is None or not self.ws.connected:
+                        self.connect()
+                    self.ws.send(json.dumps(arguments, separators=(",", ":")))
+                    sent = True
+                    while True:
+                        message = self.ws.recv()
+                        if message == "":
+                            #websocket-client returns an empty message for the server's close frame
+                            raise websocket.WebSocketConnectionClosedException("fal realtime closed the connection")
+                        replied = True
+                        if isinstance(message, bytes):
+                            #websocket-client only returns bytes for binary frames
+                            raise ValueError("fal realtime sent a binary (msgpack) frame, only JSON results are supported")
+                        result = json.loads(message)
+                        if "images" in result:
+                            return result
+                        if result.get("type") == "x-fal-error" or "error" in result or "detail" in result:
+                            raise ValueError(f"fal realtime request failed: {result}")
+                        #anything else is a status message, keep waiting for the result
+                except (websocket.WebSocketException, OSError) as e:
+                    self.close()
+                    #an idle socket dropped by the server (token expiry, idle timeout) still accepts the send and only
+                    #fails on recv, so a close before any reply is retried once on a fresh connection. A timeout or a
+                    #failure after the server answered means the request may be running remotely and is not resent
+                    dropped = not replied and isinstance(e, (websocket.WebSocketConnectionClosedException, ConnectionError))
+                    if attempt or (sent and not dropped):
+                        raise
+
+realtime_sessions = {}
+realtime_sessions_lock = threading.Lock()
+
+def get_realtime_session(app, key):
+    with realtime_sessions_lock:
+        session = realtime_sessions.get((app, key))
+        if session is None:
+            session = realtime_sessions[(app, key)] = FalRealtimeSession(app, key)
+        return session
+
+# Streaming
+
+PREVIEW_SIZE = 512
+
+class StreamPreviewer:
+    """Decodes and downscales streamed intermediate images on a worker thread and pushes them to ComfyUI's preview channel."""
+    def __init__(self, total):
+        self.total = max(1, total)
+        self.step = 0
+        self.pbar = comfy.utils.ProgressBar(self.total)
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+
+    def push(self, image):
+        self.step = min(self.step + 1, self.total)
+        #drop this preview if the previous one is still decoding, it would already be stale when shown
+        if self.pending is not None and not self.pending.done():
+            return
+        self.pending = self.pool.submit(self.preview, image, self.step)
+
+    def preview(self, image, step):
+        img = Image.open(io.BytesIO(result_image_bytes(image)))
+        img.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+        self.pbar.update_absolute(step, self.total, ("JPEG", img.convert('RGB'), PREVIEW_SIZE))
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+def stream_fal_result(endpoint, arguments, total):
+    """Run a fal request through its streaming endpoint, previewing partial images, and return the final event."""
+    previewer = StreamPreviewer(total)
+    events = transport.fal_stream(endpoint, arguments)
+    result = None
+    try:
+        for event in events:
+            comfy.model_management.throw_exception_if_processing_interrupted()
+            if event.get("images"):
+                result = event
+                previewer.push(event["images"][0])
+    finally:
+        events.close()
+        previewer.close()
+    if result is None:
+        raise ValueError(f"{endpoint} stream ended without returning an image")
+    return result
+
+def show_progress_text(text, node_id):
+    #older ComfyUI builds have no text progress channel, the final output still arrives normally there
+    if node_id is not None and hasattr(PromptServer.instance, "send_progress_text"):
+        PromptServer.instance.send_progress_text(text, node_id)
+
+# Endpoint schemas
+
+SCHEMA_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas", "endpoints.json")
+
+class EndpointSchemas:
+    """Input schemas of every endpoint the nodes call, from the bundled snapshot (refresh it with tools/refresh_schemas.py).
+
+    Arguments are checked and normalized against them locally, so a bad request fails before any upload or queued job.
+    """
+    def __init__(self, path):
+        with open(path, 'r', encoding='utf-8') as file:
+            self.schemas = json.load(file)
+
+    def field(self, endpoint, path):
+        schema = self.schemas.get(endpoint, {})
+        for name in path.split("."):
+            schema = schema.get("properties", {}).get(name)
+            if schema is None:
+                return None
+        return schema
+
+    def widget(self, endpoints, path, **options):
+        """Widget options for an INPUT_TYPES entry, with min/max/step taken from the loosest of the endpoints' limits."""
+        fields = [field for field in (self.field(endpoint, path) for endpoint in endpoints) if field]
+        lows = [field["minimum"] for field in fields if "minimum" in field]
+        highs = [field["maximum"] for field in fields if "maximum" in field]
+        steps = [field["multipleOf"] for field in fields if "multipleOf" in field]
+        if lows:
+            options["min"] = min(lows)
+        if highs:
+            options["max"] = max(highs)
+        if steps:
+            options["step"] = min(steps)
+        return options
+
+    def normalize(self, endpoint, arguments, partial=False):
+        """Copy of arguments snapped onto the endpoint's limits, raising ValueError for anything that can't be fixed locally.
+
+        partial skips the required check, for requests whose image_url is only added after the upload.
+        """
+        schema = self.schemas.get(endpoint)
+        if schema is None:
+            return arguments #nothing known about it, let the provider decide
+        return self.normalize_object(schema, arguments, endpoint, partial)
+
+    def normalize_object(self, schema, value, path, partial):
+        if not isinstance(value, dict):
+            raise ValueError(f"{path}: expected an object, got {value!r}")
+        if not partial:
+            missing = [name for name in schema.get("required", []) if name not in value]
+            if missing:
+                raise ValueError(f"{path}: missing {', '.join(missing)}")
+        properties = schema.get("properties", {})
+        #fields the snapshot doesn't describe are passed through untouched
+        return {name: self.normalize_value(properties[name], item, f"{path}.{name}", partial) if name in properties else item for name, item in value.items()}
+
+    def normalize_value(self, schema, value, path, partial):
+        if "enum" in schema and value not in schema["enum"]:
+            raise ValueError(f"{path}: {value!r} is not one of {schema['enum']}")
+        kind = schema.get("type")
+        if kind == "object":
+            return self.normalize_object(schema, value, path, partial)
+        if kind in ("integer", "number"):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{path}: expected a number, got {value!r}")
+            if "multipleOf" in schema:
+                value = round(value / schema["multipleOf"]) * schema["multipleOf"]
+            if "minimum" in schema:
+                value = max(schema["minimum"], value)
+            if "maximum" in schema:
+                value = min(schema["maximum"], value)
+            return int(value) if kind == "integer" else float(value)
+        if kind == "string" and not isinstance(value, str):
+            raise ValueError(f"{path}: expected a string, got {value!r}")
+        if kind == "boolean" and not isinstance(value, bool):
+            raise ValueError(f"{path}: expected a boolean, got {value!r}")
+        if kind == "array" and not isinstance(value, list):
+            raise ValueError(f"{path}: expected a list, got {value!r}")
+        return value
+
+endpoint_schemas = EndpointSchemas(SCHEMA_SNAPSHOT)
+
+# Generation pipeline
+
+RUNWARE_URL = "wss://ws-api.runware.ai/v1"
+
+#requests run here so a node holds a pending handle instead of blocking inside the provider client
+pipeline_pool = ThreadPoolExecutor(max_workers=16)
+
+def api_key_files():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    return [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+
+def load_api_key(api_key):
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(current_dir, "keys", api_key), 'r', encoding='utf-8') as file:
+        return file.read().strip()
+
+def tensor_to_pil(image):
+    """First image of a comfy IMAGE batch as an RGB PIL image."""
+    image_np = np.clip(255. * image[0].cpu().numpy(), 0, 255).astype(np.uint8)
+    img = Image.fromarray(image_np)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+def pil_to_png(img):
+    buffered = io.BytesIO()
+    img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+def downscale(img, max_dimension=1024):
+    """Shrink an input image so its longest side fits max_dimension, to prevent excess cost."""
+    scale_factor = max_dimension / max(img.size)
+    if scale_factor < 1:
+        img = img.resize((int(img.width * scale_factor), int(img.height * scale_factor)), Image.LANCZOS)
+    return img
+
+def match_image_size(img, image_size):
+    """Resize an i2i input to the image_size the schema settled on, so the upload and the request agree."""
+    size = (image_size["width"], image_size["height"])
+    if img.size != size:
+        img = img.resize(size, Image.LANCZOS)
+    return img
+
+def await_handle(handle):
+    """Wait for a submitted request while staying responsive to ComfyUI interrupts."""
+    while True:
+        done, _ = wait([handle], timeout=0.25)
+        if done:
+            return handle.result()
+        comfy.model_management.throw_exception_if_processing_interrupted()
+
+class ProviderBackend:
+    """build request -> submit -> await -> fetch -> decode, shared by every image node.
+
+    Nodes only build the endpoint and arguments; subclasses say how a request runs and where its image ends up.
+    """
+    provider = None
+    speculative = True
+
+    def __init__(self, api_key):
+        self.key = load_api_key(api_key)
+
+    def run(self, endpoint, arguments):
+        raise NotImplementedError
+
+    def image_url(self, result):
+        raise NotImplementedError
+
+    def schema_endpoint(self, endpoint):
+        return endpoint
+
+    def normalize(self, endpoint, arguments, partial=False):
+        return endpoint_schemas.normalize(self.schema_endpoint(endpoint), arguments, partial)
+
+    def submit(self, endpoint, arguments):
+        """Start a request in the background and return its pending handle."""
+        return pipeline_pool.submit(self.run, endpoint, self.normalize(endpoint, arguments))
+
+    def cancel(self, handle):
+        """Drop a pending request. Here only one that hasn't started can be stopped, subclasses cancel remotely where the provider allows it."""
+        handle.cancel()
+
+    def fetch(self, endpoint, result):
+        url = self.image_url(result)
+        return transport.get(url), url
+
+    def job_key(self, endpoint, arguments):
+        """Identity of a request for the speculative job table, the API key only enters it as a hash.
+
+        Hashed after normalizing, so 7 from a queued prompt and 7.0 at run time give the same key.
+        """
+        request = [type(self).__name__, getattr(self, "mode", None), hashlib.sha1(self.key.encode()).hexdigest(), endpoint, self.normalize(endpoint, arguments)]
+        return hashlib.sha1(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()
+
+    def generate(self, endpoint, arguments, seed=None):
+        #a request already submitted when the prompt was queued is picked up instead of sent again
+        handle = speculative_jobs.claim(self, endpoint, arguments) or self.submit(endpoint, arguments)
+        result = await_handle(handle)
+        data, url = self.fetch(endpoint, result)
+        return decode_image(data), cloud_image_bytes(data, self.provider, endpoint, url, seed=seed)
+
+class FalQueueRequest:
+    """A fal queue request shared between the worker that submits it and whoever may cancel it, in either order."""
+    def __init__(self):
+        self.handle = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def submitted(self, handle):
+        with self.lock:
+            self.handle = handle
+            cancelled = self.cancelled
+        if cancelled:
+            self.cancel_remote(handle)
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            handle = self.handle
+        if handle is not None:
+            self.cancel_remote(handle)
+
+    def cancel_remote(self, handle):
+        try:
+            handle.cancel()
+        except Exception as e:
+            #a request that already finished can't be cancelled, it is simply dropped
+            print(f"Could not cancel fal request {handle.request_id}: {e}")
+
+class FalBackend(ProviderBackend):
+    provider = "fal"
+
+    def __init__(self, api_key, mode="queue"):
+        super().__init__(api_key)
+        self.mode = mode
+        os.environ["FAL_KEY"] = self.key
+
+    @property
+    def speculative(self):
+        #stream and realtime requests report previews or hold a socket, only queue requests can run early
+        return self.mode == "queue"
+
+    def upload(self, img):
+        return transport.fal_upload(pil_to_png(img), "image/png")
+
+    def submit(self, endpoint, arguments):
+        if self.mode != "queue":
+            return super().submit(endpoint, arguments)
+        #keep the queue request reachable so a speculative job can be cancelled on fal's side too
+        request = FalQueueRequest()
+        handle = pipeline_pool.submit(self.run, endpoint, self.normalize(endpoint, arguments), request.submitted)
+        handle.fal_request = request
+        return handle
+
+    def cancel(self, handle):
+        super().cancel(handle)
+        if hasattr(handle, "fal_request"):
+            handle.fal_request.cancel()
+
+    def run(self, endpoint, arguments, on_submit=None):
+        if self.mode == "realtime":
+            #skip the queue, the image comes straight back over the persistent socket
+            return get_realtime_session(endpoint, self.key).generate(dict(arguments, sync_mode=True))
+        if self.mode == "stream":
+            #intermediate images are previewed as they arrive, the last event carries the final one
+            return stream_fal_result(endpoint, arguments, arguments.get("num_inference_steps", 1))
+        return transport.fal_run(endpoint, arguments, on_submit)
+
+    def image_url(self, result):
+        return result['images'][0]['url']
+
+    def fetch(self, endpoint, result):
+        if self.mode == "queue":
+            return super().fetch(endpoint, result)
+        #realtime and streamed results inline the image instead of hosting a file
+        return result_image_bytes(result['images'][0]), f"{self.mode}:{endpoint}"
+
+class ReplicateBackend(ProviderBackend):
+    provider = "replicate"
+
+    def __init__(self, api_key):
+        super().__init__(api_key)
+        os.environ["REPLICATE_API_TOKEN"] = self.key
+
+    def run(self, endpoint, arguments):
+        return transport.replicate_run(endpoint, arguments)
+
+    def image_url(self, result):
+        return result[0] if isinstance(result, list) else result #replicate started returning a different format, this works for both
+
+class RunwareBackend(ProviderBackend):
+    """endpoint is the model AIR and arguments the imageInference task fields."""
+    provider = "runware"
+
+    def schema_endpoint(self, endpoint):
+        #every model AIR shares the imageInference task schema
+        return "runware/imageInference"
+
+    def request(self, task):
+        """Authenticate and send one task over a fresh socket, returning the parsed reply."""
+        ws = transport.websocket(RUNWARE_URL)
+        try:
+            ws.send(json.dumps([{"taskType": "authentication", "apiKey": self.key}]))
+            auth_response = json.loads(ws.recv())
+            if "errors" in auth_response:
+                raise ValueError(f"Authentication failed: {auth_response['errors'][0]['message']}")
+            ws.send(json.dumps([dict(task, taskUUID=str(uuid.uuid4()))]))
+            return json.loads(ws.recv())
+        finally:
+            ws.close()
+
+    def find_model(self, air):
+        """True or False if Runware knows the AIR, None when the search itself could not answer."""
+        response = self.request({"taskType": "modelSearch", "search": air})
+        if 'errors' in response or 'data' not in response:
+            return None
+        results = [model for item in response['data'] for model in item.get("results", [])]
+        return any(model.get("air") == air for model in results)
+
+    def run(self, endpoint, arguments):
+        response = self.request(dict(arguments, taskType="imageInference", model=endpoint, outputType="URL", numberResults=1))
+        if 'errors' in response:
+            error_details = response['errors'][0]
+            raise ValueError(f"Image generation failed: {error_details['message']} (Parameter: {error_details.get('parameter')})")
+        if 'data' not in response or not response['data']:
+            raise ValueError("Image generation failed. No data returned.")
+        return response
+
+    def image_url(self, result):
+        return result['data'][0]['imageURL']
+
+# Speculative submission
+
+SPECULATIVE_NODES = ("FalFluxAPI", "ReplicateFluxAPI", "RunWareAPI")
+SPECULATIVE_GRACE = 10 #seconds a parked job survives before its prompt shows up in the queue
+
+class SpeculativeJobs:
+    """Requests submitted when a prompt is queued, for cloud nodes whose inputs are all widget constants.
+
+    The pending handle waits here until the node's generate_image claims it, so the remote latency overlaps
+    with the local part of the graph. Jobs whose prompt leaves the queue unclaimed (cancelled, interrupted,
+    failed validation) are released.
+    """
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.jobs = {}
+        self.executed = deque(maxlen=64)
+        self.lock = threading.Lock()
+        self.reaper = None
+
+    def park(self, prompt_id, backend, endpoint, arguments):
+        key = backend.job_key(endpoint, arguments)
+        with self.lock:
+            #an identical request that already ran would be served from ComfyUI's cache, don't pay for it twice
+            if key in self.jobs or key in self.executed:
+                return
+            self.jobs[key] = (prompt_id, backend, backend.submit(endpoint, arguments), time.monotonic())
+            if self.reaper is None:
+                self.reaper = threading.Thread(target=self.reap, daemon=True)
+                self.reaper.start()
+
+    def claim(self, backend, endpoint, arguments):
+        """Pending handle parked for this exact request, or None."""
+        if not self.enabled:
+            return None
+        key = backend.job_key(endpoint, arguments)
+        with self.lock:
+            self.executed.append(key)
+            job = self.jobs.pop(key, None)
+        return job[2] if job else None
+
+    def release(self, live_prompt_ids):
+        now = time.monotonic()
+        with self.lock:
+            stale = [key for key, (prompt_id, _, _, parked) in self.jobs.items() if prompt_id not in live_prompt_ids and now - parked > SPECULATIVE_GRACE]
+            released = [self.jobs.pop(key) for key in stale]
+        for key, (_, backend, handle, _) in zip(stale, released):
+            #fal requests are cancelled remotely, other providers' requests that already started still finish
+            backend.cancel(handle)
+            print(f"Released unclaimed speculative job {key[:8]}")
+
+    def reap(self):
+        while True:
+            time.sleep(1)
+            try:
+                running, pending = PromptServer.instance.prompt_queue.get_current_queue()
+                self.release({item[1] for item in running + pending})
+            except Exception as e:
+                print(f"Speculative job cleanup failed: {e}")
+
+speculative_jobs = SpeculativeJobs(os.environ.get("CLOUD_API_SPECULATIVE") == "1")
+
+def output_ancestors(prompt):
+    """Ids of the prompt's nodes that feed an output node, which are the only ones ComfyUI executes."""
+    import nodes as comfy_nodes #ComfyUI's own nodes module, this file is only loaded as part of the package
+    pending = [node_id for node_id, node in prompt.items() if getattr(comfy_nodes.NODE_CLASS_MAPPINGS.get(node.get("class_type")), "OUTPUT_NODE", False)]
+    seen = set()
+    while pending:
+        node_id = pending.pop()
+        if node_id in seen or node_id not in prompt:
+            continue
+        seen.add(node_id)
+        pending.extend(value[0] for value in prompt[node_id].get("inputs", {}).values() if isinstance(value, list))
+    return seen
+
+def cast_widget_inputs(node_class, inputs):
+    """Cast queued widget values the way ComfyUI's validation does before the node runs.
+
+    The frontend sends a whole-number FLOAT widget as a JSON int, the node itself then receives a float.
+    """
+    input_types = node_class.INPUT_TYPES()
+    declared = dict(input_types.get("required", {}), **input_types.get("optional", {}))
+    casts = {"INT": int, "FLOAT": float}
+    cast = {}
+    for name, value in inputs.items():
+        kind = declared[name][0] if name in declared else None
+        cast[name] = casts[kind](value) if isinstance(kind, str) and kind in casts else value
+    return cast
+
+def speculate_prompt(json_data):
+    """on_prompt handler submitting the constant-input cloud nodes of a freshly queued prompt."""
+    if not speculative_jobs.enabled or not isinstance(json_data.get("prompt"), dict):
+        return json_data
+    prompt = json_data["prompt"]
+    #ComfyUI keeps a prompt_id set here, which lets a parked job be matched to its queue entry
+    prompt_id = json_data.setdefault("prompt_id", str(uuid.uuid4()))
+    try:
+        reachable = output_ancestors(prompt)
+    except Exception as e:
+        print(f"Speculative submission skipped: {e}")
+        return json_data
+    for node_id in reachable:
+        node = prompt[node_id]
+        inputs = node.get("inputs", {})
+        if node.get("class_type") not in SPECULATIVE_NODES or any(isinstance(value, list) for value in inputs.values()):
+            continue
+        try:
+            node_class = NODE_CLASS_MAPPINGS[node["class_type"]]
+            backend, endpoint, arguments = node_class().build_request(**cast_widget_inputs(node_class, inputs))
+            if backend.speculative:
+                speculative_jobs.park(prompt_id, backend, endpoint, arguments)
+        except Exception as e:
+            #anything wrong is reported again when the node itself runs
+            print(f"Speculative submission skipped for node {node_id}: {e}")
+    return json_data
+
+# LoRA stacks
+
+LORA_CACHE_TTL = 3600
+LORA_FAILURE_TTL = 60
+AIR_PATTERN = re.compile(r"^[\w.-]+:[\w.-]+@[\w.-]+$")
+
+class LoraStack:
+    """Typed LoRA chain passed between the AddLora nodes, each link shares the entries before it instead of re-serializing them."""
+    def __init__(self, provider, entries=()):
+        self.provider = provider
+        self.entries = tuple(entries)
+
+    def add(self, entry):
+        return LoraStack(self.provider, self.entries + (entry,))
+
+    def arguments(self):
+        """The stack in the provider's request format."""
+        if self.provider == "runware":
+            return {"lora": [{"model": model, "weight": weight} for model, weight in self.entries]}
+        return {"loras": [{"path": path, "scale": scale} for path, scale in self.entries]}
+
+def as_lora_stack(loras, provider):
+    """Accept a LORA_STACK, or the JSON string the AddLora nodes used to produce, for the given provider."""
+    if loras is None:
+        return LoraStack(provider)
+    if isinstance(loras, str):
+        try:
+            parsed = json.loads(loras) if loras.strip() else {}
+        except json.JSONDecodeError:
+            raise ValueError("Invalid LoRA input. Must be a LORA_STACK or a JSON string.")
+        if provider == "runware":
+            entries = [(lora["model"], lora["weight"]) for lora in parsed.get("lora", [])]
+        else:
+            entries = [(lora["path"], lora["scale"]) for lora in parsed.get("loras", [])]
+        return LoraStack(provider, entries)
+    if loras.provider != provider:
+        raise ValueError(f"Got a {loras.provider} LoRA stack on a {provider} node.")
+    return loras
+
+class LoraResolver:
+    """Checks each LoRA once (HEAD for fal URLs, a model search for Runware AIRs) and remembers the answer for a while."""
+    def __init__(self):
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def cached(self, key, check):
+        """check returns (problem, verified). Only a verified success is kept for the full TTL."""
+        now = time.time()
+        with self.lock:
+            hit = self.cache.get(key)
+        if hit is not None and hit[0] > now:
+            return hit[1]
+        problem, verified = check()
+        #failures and inconclusive checks expire quickly so a fixed link, freshly published model or recovered search is picked up again
+        ttl = LORA_CACHE_TTL if verified else LORA_FAILURE_TTL
+        with self.lock:
+            self.cache[key] = (now + ttl, problem)
+        return problem
+
+    def check_url(self, url):
+        if not url.startswith(("http://", "https://")):
+            return f"{url} is not an http(s) URL"
+        def check():
+            try:
+                head = transport.head(url)
+            except requests.RequestException as e:
+                return f"{url} is unreachable ({e})", False
+            if head["status"] >= 400:
+                return f"{url} returned HTTP {head['status']}", False
+            if head["content_type"].startswith(("text/html", "application/json")):
+                return f"{url} is a {head['content_type']} page, not a LoRA file", False
+            if 0 < head["size"] < 1024:
+                return f"{url} is only {head['size']} bytes", False
+            return None, True
+        return self.cached(("url", url), check)
+
+    def check_air(self, air, backend):
+        if not AIR_PATTERN.match(air):
+            return f"{air} is not an AIR id (expected something like civitai:12345@67890)"
+        def check():
+            found = backend.find_model(air)
+            if found is False:
+                return f"{air} was not found on Runware", False
+            #a search that couldn't answer lets the request through but is asked again soon
+            return None, found is True
+        return self.cached(("air", air), check)
+
+    def validate(self, stack, backend=None):
+        """Reject a bad stack before anything is uploaded or submitted, checking all entries at once."""
+        if stack.provider == "runware":
+            futures = [pipeline_pool.submit(self.check_air, model, backend) for model, weight in stack.entries]
+        else:
+            futures = [pipeline_pool.submit(self.check_url, path) for path, scale in stack.entries]
+        problems = [problem for problem in (future.result() for future in futures) if problem]
+        if problems:
+            raise ValueError("Invalid LoRA stack:\n" + "\n".join(problems))
+
+lora_resolver = LoraResolver()
 
 # Original Node Definitions
 
 class FalLLaVAAPI:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
                 "image": ("IMAGE", {"forceInput": True,}),
                 "prompt": ("STRING", {"multiline": True, "default": "Describe this image"}),
-                "max_tokens": ("INT", {"default": 64, "min": 16, "max": 512, "step": 1}),
-                "temp": ("FLOAT", {"default": 0.2, "min": 0, "max": 1}),
-                "top_p": ("FLOAT", {"default": 1, "min": 0, "max": 1}),
-                "model": (["LLavaV15_13B", "LLavaV16_34B"],),
+                "max_tokens": ("INT", endpoint_schemas.widget(cls.MODELS.values(), "max_tokens", default=64, step=1)),
+                "temp": ("FLOAT", endpoint_schemas.widget(cls.MODELS.values(), "temperature", default=0.2)),
+                "top_p": ("FLOAT", endpoint_schemas.widget(cls.MODELS.values(), "top_p", default=1)),
+                "model": (list(cls.MODELS),),
                 "api_key": (api_keys,),
             },
+            "optional": {
+                "stream": ("BOOLEAN", {"default": False,}),
+                "stop_sequence": ("STRING", {"default": ""}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
+            },
         }
     
+    MODELS = {"LLavaV15_13B": "fal-ai/llavav15-13b",
+              "LLavaV16_34B": "fal-ai/llava-next"}
+
     RETURN_TYPES = ("STRING",)
     FUNCTION = "describe_image"
     CATEGORY = "ComfyCloudAPIs"
 
-    def describe_image(self, image, prompt, max_tokens, temp, top_p, model, api_key,):
-        #Set api key
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(os.path.join(current_dir, "keys"), api_key), 'r', encoding='utf-8') as file:
-            key = file.read()
-        os.environ["FAL_KEY"] = key
-        models = {"LLavaV15_13B": "fal-ai/llavav15-13b",
-                  "LLavaV16_34B": "fal-ai/llava-next"}
-        endpoint = models.get(model)
-        #Convert from image tensor to array
-        image_np = 255. * image.cpu().numpy().squeeze()
-        image_np = np.clip(image_np, 0, 255).astype(np.uint8)
-        img = Image.fromarray(image_np)
-        #upload image
-        buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        file = buffered.getvalue()
-        image_url = fal_client.upload(file, "image/png")
-        handler = fal_client.submit(
-        endpoint,
-        arguments={
-            "image_url": image_url,
+    def describe_image(self, image, prompt, max_tokens, temp, top_p, model, api_key, stream=False, stop_sequence="", unique_id=None):
+        backend = FalBackend(api_key)
+        endpoint = self.MODELS.get(model)
+        arguments = backend.normalize(endpoint, {
             "prompt": prompt,
             "max_tokens": max_tokens,
             "temperature": temp,
             "top_p": top_p,
-        })
-        result = handler.get()
-        output_text = result['output']
+        }, partial=True)
+        #upload image
+        arguments["image_url"] = backend.upload(tensor_to_pil(image))
+        if stream:
+            #show tokens as they arrive, stop early on the stop sequence or a user interrupt
+            output_text = ""
+            events = transport.fal_stream(endpoint, arguments)
+            try:
+                for event in events:
+                    comfy.model_management.throw_exception_if_processing_interrupted()
+                    output_text = event.get("output", output_text)
+                    if stop_sequence and stop_sequence in output_text:
+                        output_text = output_text.split(stop_sequence, 1)[0]
+                        break
+                    show_progress_text(output_text, unique_id)
+            finally:
+                events.close()
+        else:
+            result = await_handle(backend.submit(endpoint, arguments))
+            output_text = result['output']
+            if stop_sequence:
+                output_text = output_text.split(stop_sequence, 1)[0]
         return (output_text,)
 
 
 class RunwareFluxLoraImg2Img:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
                 "image": ("IMAGE", {"forceInput": True}),
-                "loras": ("STRING", {"multiline": True, "forceInput": True}),
+                "loras": ("LORA_STACK", {"forceInput": True}),
                 "positive_prompt": ("STRING", {"multiline": True}),
                 "negative_prompt": ("STRING", {"multiline": True}),
-                "steps": ("INT", {"default": 25, "min": 1, "max": 50}),
+                "steps": ("INT", endpoint_schemas.widget(["runware/imageInference"], "steps", default=25)),
                 "api_key": (api_keys,),
                 "seed": ("INT", {"default": 1337, "min": 1, "max": 16777215}),
-                "cfg": ("FLOAT", {"default": 7.0, "min": 1.0, "max": 30.0, "step": 0.5}),
-                "i2i_strength": ("FLOAT", {"default": 0.75, "min": 0.0, "max": 1.0, "step": 0.05}),
+                "cfg": ("FLOAT", endpoint_schemas.widget(["runware/imageInference"], "CFGScale", default=7.0, step=0.5)),
+                "i2i_strength": ("FLOAT", endpoint_schemas.widget(["runware/imageInference"], "strength", default=0.75, step=0.05)),
                 "model_air": ("STRING", {"default": "runware:101@1", "placeholder": "runware:101@1"}),
                 "aspect_ratio": (["same as source", "square (1:1)", "landscape (16:9)", "portrait (9:16)"],),
-                "target_size": ("INT", {"default": 1024, "min": 384, "max": 2048, "step": 64}),
+                "target_size": ("INT", endpoint_schemas.widget(["runware/imageInference"], "width", default=1024)),
+            },
+            "optional": {
+                "output_format": (OUTPUT_FORMATS,),
+                "output_quality": ("INT", {"default": 90, "min": 1, "max": 100}),
             },
         }
 
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "CLOUD_IMAGE_BYTES",)
     FUNCTION = "generate_image"
     CATEGORY = "ComfyCloudAPIs"
 
-    def adjust_dimensions(self, width, height, aspect_ratio, target_size, target_multiple=64):
+    def adjust_dimensions(self, width, height, aspect_ratio, target_size):
         """Adjust dimensions to be compatible with the API requirements while maintaining desired aspect ratio."""
+        limits = endpoint_schemas.field("runware/imageInference", "width")
+        low, high, target_multiple = limits["minimum"], limits["maximum"], limits["multipleOf"]
         if aspect_ratio == "same as source":
             # Keep original aspect ratio but adjust to valid dimensions
             ratio = width / height
             if width > height:
-                new_width = min(2048, max(384, target_size))
+                new_width = min(high, max(low, target_size))
                 new_height = int(new_width / ratio)
             else:
-                new_height = min(2048, max(384, target_size))
+                new_height = min(high, max(low, target_size))
                 new_width = int(new_height * ratio)
         elif aspect_ratio == "square (1:1)":
-            new_width = new_height = min(2048, max(384, target_size))
+            new_width = new_height = min(high, max(low, target_size))
         elif aspect_ratio == "landscape (16:9)":
-            new_width = min(2048, max(384, target_size))
+            new_width = min(high, max(low, target_size))
             new_height = (new_width * 9) // 16
             # Ensure height is valid
-            if new_height < 384:
-                new_height = 384
+            if new_height < low:
+                new_height = low
                 new_width = (new_height * 16) // 9
-            elif new_height > 2048:
-                new_height = 2048
+            elif new_height > high:
+                new_height = high
                 new_width = (new_height * 16) // 9
         elif aspect_ratio == "portrait (9:16)":
-            new_height = min(2048, max(384, target_size))
+            new_height = min(high, max(low, target_size))
             new_width = (new_height * 9) // 16
             # Ensure width is valid
-            if new_width < 384:
-                new_width = 384
+            if new_width < low:
+                new_width = low
                 new_height = (new_width * 16) // 9
-            elif new_width > 2048:
-                new_width = 2048
+            elif new_width > high:
+                new_width = high
                 new_height = (new_width * 16) // 9
         
         # Round to nearest multiple of target_multiple
@@ -129,122 +1129,37 @@ class RunwareFluxLoraImg2Img:
         new_height = ((new_height + target_multiple - 1) // target_multiple) * target_multiple
         
         # Final validation to ensure dimensions are within bounds
-        new_width = max(384, min(2048, new_width))
-        new_height = max(384, min(2048, new_height))
+        new_width = max(low, min(high, new_width))
+        new_height = max(low, min(high, new_height))
         
         print(f"Adjusting dimensions from {width}x{height} to {new_width}x{new_height} ({aspect_ratio})")
         return new_width, new_height
 
-    def parse_lora_inputs(self, loras):
-        print("Parsing LoRA inputs...")
-        if loras:
-            try:
-                parsed_loras = json.loads(loras)
-                if isinstance(parsed_loras, dict) and "lora" in parsed_loras:
-                    for lora in parsed_loras["lora"]:
-                        if not all(key in lora for key in ("model", "weight")):
-                            raise ValueError("Each LoRA entry must contain 'model' and 'weight'.")
-                    return parsed_loras
-                else:
-                    raise ValueError("Invalid LoRA format. Expected {'lora': [{model, weight}]}")
-            except json.JSONDecodeError:
-                raise ValueError("Invalid LoRA input. Must be a JSON string.")
-        return {"lora": []}
-
-    def generate_image(self, image, loras, positive_prompt, negative_prompt, steps, api_key, seed, cfg, i2i_strength, model_air, aspect_ratio, target_size):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(current_dir, "keys", api_key), 'r', encoding='utf-8') as file:
-            key = file.read().strip()
-
-        ws = websocket.create_connection("wss://ws-api.runware.ai/v1")
-        try:
-            # Authentication
-            auth_request = [{"taskType": "authentication", "apiKey": key}]
-            ws.send(json.dumps(auth_request))
-            auth_response = json.loads(ws.recv())
-            if "errors" in auth_response:
-                raise ValueError(f"Authentication failed: {auth_response['errors'][0]['message']}")
-
-            # Process input image
-            image_np = 255. * image.cpu().numpy().squeeze()
-            image_np = np.clip(image_np, 0, 255).astype(np.uint8)
-            img = Image.fromarray(image_np)
-            
-            # Convert to RGB if needed
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Get original dimensions
-            orig_width, orig_height = img.size
-            
-            # Adjust dimensions to meet API requirements and desired aspect ratio
-            width, height = self.adjust_dimensions(orig_width, orig_height, aspect_ratio, target_size)
-            
-            # Resize image
-            img = img.resize((width, height), Image.Resampling.LANCZOS)
-            
-            # Convert and upload image
-            buffered = io.BytesIO()
-            img.save(buffered, format="PNG")
-            file = buffered.getvalue()
-            encoded_image = base64.b64encode(file).decode('utf-8')
-
-            # Upload image
-            upload_request = [{"taskType": "imageUpload", "taskUUID": str(uuid.uuid4()), "image": f"data:image/png;base64,{encoded_image}"}]
-            ws.send(json.dumps(upload_request))
-            upload_response = json.loads(ws.recv())
-            if 'data' not in upload_response or not upload_response['data']:
-                raise ValueError("Image upload failed. No data returned.")
-
-            parsed_loras = self.parse_lora_inputs(loras)
-
-            # Create image inference request
-            image_request = [{
-                "taskType": "imageInference",
-                "taskUUID": str(uuid.uuid4()),
-                "outputType": "URL",
-                "outputFormat": "PNG",
-                "positivePrompt": positive_prompt,
-                "negativePrompt": negative_prompt,
-                "model": model_air,
-                "seedImage": f"data:image/png;base64,{encoded_image}",
-                "lora": parsed_loras["lora"],
-                "steps": steps,
-                "seed": seed,
-                "CFGScale": cfg,
-                "strength": i2i_strength,
-                "width": width,
-                "height": height,
-                "numberResults": 1
-            }]
-            
-            ws.send(json.dumps(image_request))
-            image_response = json.loads(ws.recv())
-            
-            if 'errors' in image_response:
-                error_details = image_response['errors'][0]
-                raise ValueError(f"Image generation failed: {error_details['message']} (Parameter: {error_details['parameter']})")
-
-            if 'data' not in image_response or not image_response['data']:
-                raise ValueError("Image generation failed. No data returned.")
-
-            # Process generated image
-            image_url = image_response['data'][0]['imageURL']
-            response = requests.get(image_url)
-            img = Image.open(io.BytesIO(response.content))
-            
-            # Convert to RGB if needed
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-                
-            # Convert to tensor format
-            image = np.array(img).astype(np.float32) / 255.0
-            image = torch.from_numpy(image)[None,]
-
-            return (image,)
-
-        finally:
-            ws.close()
+    def generate_image(self, image, loras, positive_prompt, negative_prompt, steps, api_key, seed, cfg, i2i_strength, model_air, aspect_ratio, target_size, output_format="png", output_quality=90):
+        backend = RunwareBackend(api_key)
+        loras = as_lora_stack(loras, "runware")
+        lora_resolver.validate(loras, backend)
+        img = tensor_to_pil(image)
+        # Adjust dimensions to meet API requirements and desired aspect ratio
+        width, height = self.adjust_dimensions(img.width, img.height, aspect_ratio, target_size)
+        arguments = {
+            "positivePrompt": positive_prompt,
+            "negativePrompt": negative_prompt,
+            "steps": steps,
+            "seed": seed,
+            "CFGScale": cfg,
+            "strength": i2i_strength,
+            "width": width,
+            "height": height,
+        }
+        arguments.update(loras.arguments())
+        arguments.update(output_format_args("runware", output_format, output_quality))
+        arguments = backend.normalize(model_air, arguments)
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+        # The seed image travels inline with the inference task, no separate upload round trip
+        encoded_image = base64.b64encode(pil_to_png(img)).decode('utf-8')
+        arguments["seedImage"] = f"data:image/png;base64,{encoded_image}"
+        return backend.generate(model_air, arguments, seed=seed)
 
 # rest of nodes
 
@@ -254,163 +1169,119 @@ class RunwareFluxLoraImg2Img:
 class FalAuraFlowAPI:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
                 "prompt": ("STRING", {"multiline": True}),
-                "steps": ("INT", {"default": 30, "min": 1, "max": 50}),
+                "steps": ("INT", endpoint_schemas.widget(["fal-ai/aura-flow"], "num_inference_steps", default=30)),
                 "api_key": (api_keys,),
                 "seed": ("INT", {"default": 1337, "min": 1, "max": 16777215}),
-                "cfg": ("FLOAT", {"default": 3.5, "min": 0, "max": 20, "step": 0.5, "forceInput": False}),
+                "cfg": ("FLOAT", endpoint_schemas.widget(["fal-ai/aura-flow"], "guidance_scale", default=3.5, step=0.5, forceInput=False)),
                 "expand_prompt": ("BOOLEAN", {"default": False}),
             },
+            "optional": {
+                "stream": ("BOOLEAN", {"default": False,}),
+            },
         }
     
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "CLOUD_IMAGE_BYTES",)
     FUNCTION = "generate_image"
     CATEGORY = "ComfyCloudAPIs"
 
-    def generate_image(self, prompt, steps, api_key, seed, cfg, expand_prompt):
-        #Set api key
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(os.path.join(current_dir, "keys"), api_key), 'r', encoding='utf-8') as file:
-            key = file.read()
-        os.environ["FAL_KEY"] = key
-        handler = fal_client.submit(
-        "fal-ai/aura-flow",
-        arguments={
+    def generate_image(self, prompt, steps, api_key, seed, cfg, expand_prompt, stream=False):
+        backend = FalBackend(api_key, mode="stream" if stream else "queue")
+        arguments = {
             "prompt": prompt,
             "seed": seed,
             "guidance_scale": cfg,
             "num_inference_steps": steps,
             "num_images": 1, #Hardcoded to 1 for now
             "expand_prompt": expand_prompt,}
-        )
-        result = handler.get()
-        image_url = result['images'][0]['url']
-        #Download the image
-        response = requests.get(image_url)
-        image = Image.open(io.BytesIO(response.content))
-        #make image more comfy
-        image = np.array(image).astype(np.float32) / 255.0
-        output_image = torch.from_numpy(image)[None,]
-        return (output_image,) 
+        return backend.generate("fal-ai/aura-flow", arguments, seed=seed)
 
 class FalStableCascadeAPI:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
                 "prompt": ("STRING", {"multiline": True,}),
                 "negative_prompt": ("STRING", {"multiline": True, "default": "ugly, deformed",}),
-                "width": ("INT", {"default": 1024, "min": 256, "max": 2048, "step": 8}),
-                "height": ("INT", {"default": 1024, "min": 256, "max": 2048, "step": 8}),
-                "first_stage_steps": ("INT", {"default": 20, "min": 1, "max": 50}),
-                "second_stage_steps": ("INT", {"default": 10, "min": 1, "max": 24}),
-                "guidance_scale": ("FLOAT", {"default": 4.0, "min": 0.0, "max": 20.0, "step": 0.5}),
-                "decoder_guidance_scale": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 20.0, "step": 0.5}),
+                "width": ("INT", endpoint_schemas.widget(["fal-ai/stable-cascade"], "image_size.width", default=1024)),
+                "height": ("INT", endpoint_schemas.widget(["fal-ai/stable-cascade"], "image_size.height", default=1024)),
+                "first_stage_steps": ("INT", endpoint_schemas.widget(["fal-ai/stable-cascade"], "first_stage_steps", default=20)),
+                "second_stage_steps": ("INT", endpoint_schemas.widget(["fal-ai/stable-cascade"], "second_stage_steps", default=10)),
+                "guidance_scale": ("FLOAT", endpoint_schemas.widget(["fal-ai/stable-cascade"], "guidance_scale", default=4.0, step=0.5)),
+                "decoder_guidance_scale": ("FLOAT", endpoint_schemas.widget(["fal-ai/stable-cascade"], "second_stage_guidance_scale", default=0.0, step=0.5)),
                 "api_key": (api_keys,),
                 "seed": ("INT", {"default": 0, "min": 0, "max": 16777215,}),
             },
         }
    
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "CLOUD_IMAGE_BYTES",)
     FUNCTION = "generate_image"
     CATEGORY = "ComfyCloudAPIs"
 
     def generate_image(self, prompt, negative_prompt, width, height, first_stage_steps, second_stage_steps, guidance_scale, decoder_guidance_scale, api_key, seed):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(os.path.join(current_dir, "keys"), api_key), 'r', encoding='utf-8') as file:
-            key = file.read()
-        os.environ["FAL_KEY"] = key
-
-        handler = fal_client.submit(
-            "fal-ai/stable-cascade",
-            arguments={
-                "prompt": prompt,
-                "negative_prompt": negative_prompt,
-                "image_size": {
-                    "width": width,
-                    "height": height,
-                },
-                "first_stage_steps": first_stage_steps,
-                "second_stage_steps": second_stage_steps,
-                "guidance_scale": guidance_scale,
-                "second_stage_guidance_scale": decoder_guidance_scale,
-                "enable_safety_checker": False,
-                "num_images": 1,
-                "seed": seed,
-            }
-        )
-
-        result = handler.get()
-        image_url = result['images'][0]['url']
-        response = requests.get(image_url)
-        image = Image.open(io.BytesIO(response.content))
-        image = np.array(image).astype(np.float32) / 255.0
-        output_image = torch.from_numpy(image)[None,]
-        
-        return (output_image,)
+        backend = FalBackend(api_key)
+        arguments = {
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "image_size": {
+                "width": width,
+                "height": height,
+            },
+            "first_stage_steps": first_stage_steps,
+            "second_stage_steps": second_stage_steps,
+            "guidance_scale": guidance_scale,
+            "second_stage_guidance_scale": decoder_guidance_scale,
+            "enable_safety_checker": False,
+            "num_images": 1,
+            "seed": seed,
+        }
+        return backend.generate("fal-ai/stable-cascade", arguments, seed=seed)
 
 class FalSoteDiffusionAPI:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
                 "prompt": ("STRING", {"multiline": True, "default": "newest, extremely aesthetic, best quality,",}),
                 "negative_prompt": ("STRING", {"multiline": True, "default": "very displeasing, worst quality, monochrome, realistic, oldest",}),
-                "width": ("INT", {"default": 1024, "min": 256, "max": 2048, "step": 8}),
-                "height": ("INT", {"default": 1024, "min": 256, "max": 2048, "step": 8}),
-                "first_stage_steps": ("INT", {"default": 25, "min": 1, "max": 50}),
-                "second_stage_steps": ("INT", {"default": 10, "min": 1, "max": 24}),
-                "guidance_scale": ("FLOAT", {"default": 8.0, "min": 0.0, "max": 20.0, "step": 0.5}),
-                "decoder_guidance_scale": ("FLOAT", {"default": 2.0, "min": 0.0, "max": 20.0, "step": 0.5}),
+                "width": ("INT", endpoint_schemas.widget(["fal-ai/stable-cascade/sote-diffusion"], "image_size.width", default=1024)),
+                "height": ("INT", endpoint_schemas.widget(["fal-ai/stable-cascade/sote-diffusion"], "image_size.height", default=1024)),
+                "first_stage_steps": ("INT", endpoint_schemas.widget(["fal-ai/stable-cascade/sote-diffusion"], "first_stage_steps", default=25)),
+                "second_stage_steps": ("INT", endpoint_schemas.widget(["fal-ai/stable-cascade/sote-diffusion"], "second_stage_steps", default=10)),
+                "guidance_scale": ("FLOAT", endpoint_schemas.widget(["fal-ai/stable-cascade/sote-diffusion"], "guidance_scale", default=8.0, step=0.5)),
+                "decoder_guidance_scale": ("FLOAT", endpoint_schemas.widget(["fal-ai/stable-cascade/sote-diffusion"], "second_stage_guidance_scale", default=2.0, step=0.5)),
                 "api_key": (api_keys,),
                 "seed": ("INT", {"default": 0, "min": 0, "max": 16777215,}),
             },
         }
    
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "CLOUD_IMAGE_BYTES",)
     FUNCTION = "generate_image"
     CATEGORY = "ComfyCloudAPIs"
 
     def generate_image(self, prompt, negative_prompt, width, height, first_stage_steps, second_stage_steps, guidance_scale, decoder_guidance_scale, api_key, seed):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(os.path.join(current_dir, "keys"), api_key), 'r', encoding='utf-8') as file:
-            key = file.read()
-        os.environ["ANIME_STYLE_API_KEY"] = key
-
-        handler = fal_client.submit(
-            "fal-ai/stable-cascade/sote-diffusion",
-            arguments={
-                "prompt": prompt,
-                "negative_prompt": negative_prompt,
-                "image_size": {
-                    "width": width,
-                    "height": height,
-                },
-                "first_stage_steps": first_stage_steps,
-                "second_stage_steps": second_stage_steps,
-                "guidance_scale": guidance_scale,
-                "second_stage_guidance_scale": decoder_guidance_scale,
-                "enable_safety_checker": False,
-                "num_images": 1,
-                "seed": seed,
-            }
-        )
-
-        result = handler.get()
-        image_url = result['images'][0]['url']
-        response = requests.get(image_url)
-        image = Image.open(io.BytesIO(response.content))
-        image = np.array(image).astype(np.float32) / 255.0
-        output_image = torch.from_numpy(image)[None,]
-        return (output_image,)
+        backend = FalBackend(api_key)
+        arguments = {
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "image_size": {
+                "width": width,
+                "height": height,
+            },
+            "first_stage_steps": first_stage_steps,
+            "second_stage_steps": second_stage_steps,
+            "guidance_scale": guidance_scale,
+            "second_stage_guidance_scale": decoder_guidance_scale,
+            "enable_safety_checker": False,
+            "num_images": 1,
+            "seed": seed,
+        }
+        return backend.generate("fal-ai/stable-cascade/sote-diffusion", arguments, seed=seed)
 
 class FalAddLora:
     @classmethod
@@ -421,56 +1292,50 @@ class FalAddLora:
                 "scale": ("FLOAT", {"default": 1, "min": 0.1, "max": 4}),
             },
             "optional":{
-                "loras": ("STRING", {"forceInput": True,}),
+                "loras": ("LORA_STACK", {"forceInput": True,}),
             }
         }
     
-    RETURN_TYPES = ("STRING",)
+    RETURN_TYPES = ("LORA_STACK",)
     FUNCTION = "string_lora"
     CATEGORY = "ComfyCloudAPIs"
 
     def string_lora(self, lora_url, scale, loras=None):
-        if loras is not None:
-            lora_dict = json.loads(loras)
-        else:
-            lora_dict = {"loras": []}
-        lora_dict["loras"].append({"path": lora_url, "scale": scale})
-        output_loras = json.dumps(lora_dict)
-        return (output_loras,)
+        return (as_lora_stack(loras, "fal").add((lora_url.strip(), scale)),)
 
 class FalFluxLoraAPI:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
-                "loras": ("STRING", {"forceInput": True,}),
+                "loras": ("LORA_STACK", {"forceInput": True,}),
                 "prompt": ("STRING", {"multiline": True}),
-                "width": ("INT", {"default": 1024, "min": 256, "max": 2048, "step": 16, "forceInput": False}),
-                "height": ("INT", {"default": 1024, "min": 256, "max": 2048, "step": 16, "forceInput": False}),
-                "steps": ("INT", {"default": 25, "min": 1, "max": 50}),
+                "width": ("INT", endpoint_schemas.widget(["fal-ai/flux-lora", "fal-ai/flux-lora/image-to-image"], "image_size.width", default=1024, step=16, forceInput=False)),
+                "height": ("INT", endpoint_schemas.widget(["fal-ai/flux-lora", "fal-ai/flux-lora/image-to-image"], "image_size.height", default=1024, step=16, forceInput=False)),
+                "steps": ("INT", endpoint_schemas.widget(["fal-ai/flux-lora", "fal-ai/flux-lora/image-to-image"], "num_inference_steps", default=25)),
                 "api_key": (api_keys,),
                 "seed": ("INT", {"default": 1337, "min": 1, "max": 16777215}),
-                "cfg": ("FLOAT", {"default": 3.5, "min": 1, "max": 20, "step": 0.5, "forceInput": False}),
+                "cfg": ("FLOAT", endpoint_schemas.widget(["fal-ai/flux-lora", "fal-ai/flux-lora/image-to-image"], "guidance_scale", default=3.5, step=0.5, forceInput=False)),
                 "no_downscale": ("BOOLEAN", {"default": False,}),
-                "i2i_strength": ("FLOAT", {"default": 0.90, "min": 0.01, "max": 1, "step": 0.01}),
+                "i2i_strength": ("FLOAT", endpoint_schemas.widget(["fal-ai/flux-lora", "fal-ai/flux-lora/image-to-image"], "strength", default=0.90, step=0.01)),
             },
             "optional":{
                 "image": ("IMAGE", {"forceInput": True,}),
+                "output_format": (OUTPUT_FORMATS,),
+                "output_quality": ("INT", {"default": 90, "min": 1, "max": 100}),
             }
         }
     
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "CLOUD_IMAGE_BYTES",)
     FUNCTION = "generate_image"
     CATEGORY = "ComfyCloudAPIs"
 
-    def generate_image(self, loras, prompt, width, height, steps, api_key, seed, cfg, no_downscale, i2i_strength, image=None,):
-        #Set api key
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(os.path.join(current_dir, "keys"), api_key), 'r', encoding='utf-8') as file:
-            key = file.read()
-        os.environ["FAL_KEY"] = key
+    def generate_image(self, loras, prompt, width, height, steps, api_key, seed, cfg, no_downscale, i2i_strength, image=None, output_format="png", output_quality=90):
+        backend = FalBackend(api_key)
+        #catch a bad LoRA before paying for the upload and a queued job
+        loras = as_lora_stack(loras, "fal")
+        lora_resolver.validate(loras)
         full_args = {
             "prompt": prompt,
             "seed": seed,
@@ -483,116 +1348,202 @@ class FalFluxLoraAPI:
             "num_inference_steps": steps,
             "num_images": 1, #Hardcoded to 1 for now
         }
-        loras = json.loads(loras)
         endpoint = "fal-ai/flux-lora"
         if image is not None:
             endpoint = "fal-ai/flux-lora/image-to-image"
-            #Convert from image tensor to array
-            image_np = 255. * image.cpu().numpy().squeeze()
-            image_np = np.clip(image_np, 0, 255).astype(np.uint8)
-            img = Image.fromarray(image_np)
-            #downscale image to prevent excess cost
-            width, height = img.size #get size for checking
-            max_dimension = max(width, height)
-            scale_factor = 1024 / max_dimension
-            if scale_factor < 1 and not no_downscale:
-                new_width = int(width * scale_factor)
-                new_height = int(height * scale_factor)
-                img = img.resize((new_width, new_height), Image.LANCZOS)
-            width, height = img.size #get size for api
-            #upload image
-            buffered = io.BytesIO()
-            img.save(buffered, format="PNG")
-            file = buffered.getvalue()
-            image_url = fal_client.upload(file, "image/png")
+            img = tensor_to_pil(image)
+            if not no_downscale:
+                img = downscale(img)
             #setup img2img
-            i2i_args = {
-                "image_url": image_url,
+            full_args.update({
+                "image_size": {
+                    "width": img.width,
+                    "height": img.height},
                 "strength": i2i_strength,
-            }
-            full_args.update(i2i_args)
-        full_args.update(loras)
-        handler = fal_client.submit(endpoint, arguments= full_args)
-        result = handler.get()
-        image_url = result['images'][0]['url']
-        #Download the image
-        response = requests.get(image_url)
-        image = Image.open(io.BytesIO(response.content))
-        #make image more comfy
-        image = np.array(image).astype(np.float32) / 255.0
-        output_image = torch.from_numpy(image)[None,]
-        return (output_image,)
+            })
+        full_args.update(loras.arguments())
+        full_args.update(output_format_args("fal", output_format, output_quality))
+        full_args = backend.normalize(endpoint, full_args, partial=True)
+        if image is not None:
+            full_args["image_url"] = backend.upload(match_image_size(img, full_args["image_size"]))
+        return backend.generate(endpoint, full_args, seed=seed)
 
 class FalFluxI2IAPI:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
                 "image": ("IMAGE", {"forceInput": True,}),
                 "prompt": ("STRING", {"multiline": True}),
-                "strength": ("FLOAT", {"default": 0.90, "min": 0.01, "max": 1, "step": 0.01}),
-                "steps": ("INT", {"default": 25, "min": 1, "max": 50}),
+                "strength": ("FLOAT", endpoint_schemas.widget(["fal-ai/flux/dev/image-to-image"], "strength", default=0.90, step=0.01)),
+                "steps": ("INT", endpoint_schemas.widget(["fal-ai/flux/dev/image-to-image"], "num_inference_steps", default=25)),
                 "api_key": (api_keys,),
                 "seed": ("INT", {"default": 1337, "min": 1, "max": 16777215}),
-                "cfg": ("FLOAT", {"default": 3.5, "min": 1, "max": 20, "step": 0.5, "forceInput": False}),
+                "cfg": ("FLOAT", endpoint_schemas.widget(["fal-ai/flux/dev/image-to-image"], "guidance_scale", default=3.5, step=0.5, forceInput=False)),
                 "no_downscale": ("BOOLEAN", {"default": False,}),
             },
+            "optional": {
+                "output_format": (OUTPUT_FORMATS,),
+                "output_quality": ("INT", {"default": 90, "min": 1, "max": 100}),
+            },
         }
     
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "CLOUD_IMAGE_BYTES",)
     FUNCTION = "generate_image"
     CATEGORY = "ComfyCloudAPIs"
 
-    def generate_image(self, image, prompt, strength, steps, api_key, seed, cfg, no_downscale):
-        #Set api key
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(os.path.join(current_dir, "keys"), api_key), 'r', encoding='utf-8') as file:
-            key = file.read()
-        os.environ["FAL_KEY"] = key
-        #Convert from image tensor to array
-        image_np = 255. * image.cpu().numpy().squeeze()
-        image_np = np.clip(image_np, 0, 255).astype(np.uint8)
-        img = Image.fromarray(image_np)
-        #downscale image to prevent excess cost
-        width, height = img.size #get size for checking
-        max_dimension = max(width, height)
-        scale_factor = 1024 / max_dimension
-        if scale_factor < 1 and not no_downscale:
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            img = img.resize((new_width, new_height), Image.LANCZOS)
-        width, height = img.size #get size for api
-        #upload image
-        buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        file = buffered.getvalue()
-        image_url = fal_client.upload(file, "image/png")
-        handler = fal_client.submit(
-        "fal-ai/flux/dev/image-to-image",
-        arguments={
-            "image_url": image_url,
+    def generate_image(self, image, prompt, strength, steps, api_key, seed, cfg, no_downscale, output_format="png", output_quality=90):
+        backend = FalBackend(api_key)
+        img = tensor_to_pil(image)
+        if not no_downscale:
+            img = downscale(img)
+        arguments = {
             "prompt": prompt,
             "seed": seed,
             "steps": steps,
             "image_size": {
-                "width": width,
-                "height": height},
+                "width": img.width,
+                "height": img.height},
             "strength": strength,
             "guidance_scale": cfg,
             "enable_safety_checker": False,
             "num_inference_steps": steps,
             "num_images": 1, #Hardcoded to 1 for now
+        }
+        arguments.update(output_format_args("fal", output_format, output_quality))
+        arguments = backend.normalize("fal-ai/flux/dev/image-to-image", arguments, partial=True)
+        arguments["image_url"] = backend.upload(match_image_size(img, arguments["image_size"]))
+        return backend.generate("fal-ai/flux/dev/image-to-image", arguments, seed=seed)
+
+class FalFluxTiledRefineAPI:
+    @classmethod
+    def INPUT_TYPES(cls):
+        api_keys = api_key_files()
+        return {
+            "required": {
+                "image": ("IMAGE", {"forceInput": True,}),
+                "prompt": ("STRING", {"multiline": True}),
+                "strength": ("FLOAT", endpoint_schemas.widget(["fal-ai/flux/dev/image-to-image", "fal-ai/flux-lora/image-to-image"], "strength", default=0.35, step=0.01)),
+                "steps": ("INT", endpoint_schemas.widget(["fal-ai/flux/dev/image-to-image", "fal-ai/flux-lora/image-to-image"], "num_inference_steps", default=25)),
+                "api_key": (api_keys,),
+                "seed": ("INT", {"default": 1337, "min": 1, "max": 16777215}),
+                "cfg": ("FLOAT", endpoint_schemas.widget(["fal-ai/flux/dev/image-to-image", "fal-ai/flux-lora/image-to-image"], "guidance_scale", default=3.5, step=0.5, forceInput=False)),
+                "tile_size": ("INT", {"default": 1024, "min": 256, "max": 1024, "step": 16}),
+                "overlap": ("INT", {"default": 128, "min": 16, "max": 512, "step": 16}),
+                "max_concurrency": ("INT", {"default": 8, "min": 1, "max": 32}),
+            },
+            "optional":{
+                "loras": ("LORA_STACK", {"forceInput": True,}),
+                "output_format": (OUTPUT_FORMATS,),
+                "output_quality": ("INT", {"default": 90, "min": 1, "max": 100}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "generate_image"
+    CATEGORY = "ComfyCloudAPIs"
+
+    def tile_starts(self, length, tile, overlap):
+        """Start offsets along one axis so tiles of size tile cover length with at least overlap px shared."""
+        if length <= tile:
+            return [0]
+        stride = max(1, tile - overlap)
+        starts = list(range(0, length - tile, stride))
+        starts.append(length - tile) # last tile is snapped to the edge
+        return starts
+
+    def feather_ramps(self, starts, tile):
+        """1D blend weights for every tile along one axis.
+
+        Each side fades across the overlap it really shares with its neighbour, which is wider than the
+        requested overlap for the tile snapped to the edge, so the crossfade always spans the whole seam.
+        """
+        ramps = []
+        for index, start in enumerate(starts):
+            ramp = torch.ones(tile)
+            position = torch.arange(tile, dtype=torch.float32) + 1
+            if index > 0:
+                shared = starts[index - 1] + tile - start
+                ramp = torch.minimum(ramp, torch.clamp(position / (shared + 1), max=1.0))
+            if index < len(starts) - 1:
+                shared = start + tile - starts[index + 1]
+                ramp = torch.minimum(ramp, torch.clamp(position / (shared + 1), max=1.0).flip(0))
+            ramps.append(ramp)
+        return ramps
+
+    def refine_tile(self, backend, tile, endpoint, base_args):
+        height, width = tile.shape[:2]
+        args = dict(base_args)
+        args.update({
+            "image_url": backend.upload(tensor_to_pil(tile[None,])),
+            "image_size": {
+                "width": width,
+                "height": height},
         })
-        result = handler.get()
-        image_url = result['images'][0]['url']
-        #Download the image
-        response = requests.get(image_url)
-        image = Image.open(io.BytesIO(response.content))
-        #make image more comfy
-        image = np.array(image).astype(np.float32) / 255.0
-        output_image = torch.from_numpy(image)[None,]
+        result = backend.run(endpoint, args)
+        data, url = backend.fetch(endpoint, result)
+        out = decode_image(data)[0]
+        #provider may round the size, bring it back to the tile grid
+        if out.shape[0] != height or out.shape[1] != width:
+            out = torch.nn.functional.interpolate(out.permute(2, 0, 1)[None,], size=(height, width), mode="bicubic", align_corners=False)[0].permute(1, 2, 0)
+        return out
+
+    def generate_image(self, image, prompt, strength, steps, api_key, seed, cfg, tile_size, overlap, max_concurrency, loras=None, output_format="png", output_quality=90):
+        backend = FalBackend(api_key)
+        source = image[0, :, :, :3]
+        height, width = source.shape[:2]
+        overlap = min(overlap, tile_size // 2)
+        base_args = {
+            "prompt": prompt,
+            "strength": strength,
+            "guidance_scale": cfg,
+            "enable_safety_checker": False,
+            "num_inference_steps": steps,
+            "num_images": 1,
+        }
+        base_args.update(output_format_args("fal", output_format, output_quality))
+        endpoint = "fal-ai/flux/dev/image-to-image"
+        if loras is not None:
+            endpoint = "fal-ai/flux-lora/image-to-image"
+            loras = as_lora_stack(loras, "fal")
+            lora_resolver.validate(loras)
+            base_args.update(loras.arguments())
+        #tiles go through backend.run directly, so check the shared arguments once up front
+        base_args = backend.normalize(endpoint, base_args, partial=True)
+        #split into overlapping tiles, each with its own seed
+        tile_h, tile_w = min(tile_size, height), min(tile_size, width)
+        ys, xs = self.tile_starts(height, tile_size, overlap), self.tile_starts(width, tile_size, overlap)
+        ramps_y, ramps_x = self.feather_ramps(ys, tile_h), self.feather_ramps(xs, tile_w)
+        boxes = [(row, column) for row in range(len(ys)) for column in range(len(xs))]
+        jobs = []
+        for index, (row, column) in enumerate(boxes):
+            y, x = ys[row], xs[column]
+            tile_args = dict(base_args, seed=seed + index)
+            jobs.append((backend, source[y:y + tile_h, x:x + tile_w], endpoint, tile_args))
+        #send every tile at once so wall time is close to a single call
+        pool = ThreadPoolExecutor(max_workers=min(max_concurrency, len(jobs)))
+        try:
+            futures = [pool.submit(self.refine_tile, *job) for job in jobs]
+            pending = futures
+            while pending:
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    future.result() #first failed tile aborts the rest
+                comfy.model_management.throw_exception_if_processing_interrupted()
+            tiles = [future.result() for future in futures]
+        finally:
+            #tiles that haven't started yet are dropped on failure or interrupt
+            pool.shutdown(wait=False, cancel_futures=True)
+        #feathered blend back onto the full canvas
+        canvas = torch.zeros((height, width, 3))
+        weights = torch.zeros((height, width, 1))
+        for (row, column), tile in zip(boxes, tiles):
+            y, x = ys[row], xs[column]
+            mask = (ramps_y[row][:, None] * ramps_x[column][None, :])[:, :, None]
+            canvas[y:y + tile_h, x:x + tile_w] += tile * mask
+            weights[y:y + tile_h, x:x + tile_w] += mask
+        output_image = (canvas / weights.clamp(min=1e-6))[None,]
         return (output_image,)
 
 class FluxResolutionPresets:
@@ -633,145 +1584,115 @@ class RunwareAddLora:
                 "weight": ("FLOAT", {"default": 1, "min": 0.1, "max": 4}),
             },
             "optional":{
-                "loras": ("STRING", {"forceInput": True,}),
+                "loras": ("LORA_STACK", {"forceInput": True,}),
             }
         }
     
-    RETURN_TYPES = ("STRING",)
+    RETURN_TYPES = ("LORA_STACK",)
     FUNCTION = "string_lora"
     CATEGORY = "ComfyCloudAPIs"
 
     def string_lora(self, lora_air, weight, loras=None):
-        if loras is not None:
-            lora_dict = json.loads(loras)
-        else:
-            lora_dict = {"lora": []}
-        lora_dict["lora"].append({"model": lora_air, "weight": weight})
-        output_loras = json.dumps(lora_dict)
-        return (output_loras,)
+        return (as_lora_stack(loras, "runware").add((lora_air.strip(), weight)),)
 
 class RunWareAPI:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
                 "positive_prompt": ("STRING", {"multiline": True}),
                 "negative_prompt": ("STRING", {"multiline": True}),
-                "width": ("INT", {"default": 1024, "min": 512, "max": 2048, "step": 16, "forceInput": False}),
-                "height": ("INT", {"default": 1024, "min": 512, "max": 2048, "step": 16, "forceInput": False}),
-                "steps": ("INT", {"default": 20, "min": 1, "max": 100}),
+                "width": ("INT", endpoint_schemas.widget(["runware/imageInference"], "width", default=1024, forceInput=False)),
+                "height": ("INT", endpoint_schemas.widget(["runware/imageInference"], "height", default=1024, forceInput=False)),
+                "steps": ("INT", endpoint_schemas.widget(["runware/imageInference"], "steps", default=20)),
                 "api_key": (api_keys,),
                 "seed": ("INT", {"default": 1337, "min": 1, "max": 16777215}),
-                "cfg": ("FLOAT", {"default": 7, "min": 0, "max": 30, "step": 0.5, "forceInput": False}),
+                "cfg": ("FLOAT", endpoint_schemas.widget(["runware/imageInference"], "CFGScale", default=7, step=0.5, forceInput=False)),
                 "model_air": ("STRING",), # this expects a model name formatted with civit's air system. They have their selection here: https://docs.runware.ai/en/image-inference/models#model-explorer
             },
             "optional": {
-                "loras": ("STRING", {"forceInput": True}),
+                "loras": ("LORA_STACK", {"forceInput": True}),
+                "output_format": (OUTPUT_FORMATS,),
+                "output_quality": ("INT", {"default": 90, "min": 1, "max": 100}),
             }
         }
     
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "CLOUD_IMAGE_BYTES",)
     FUNCTION = "generate_image"
     CATEGORY = "ComfyCloudAPIs"
 
-    def generate_image(self, positive_prompt, negative_prompt, width, height, steps, api_key, seed, cfg, model_air, loras=None):
-        # Set api key
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(os.path.join(current_dir, "keys"), api_key), 'r', encoding='utf-8') as file:
-            key = file.read()
-        # connect to api websocket
-        ws = websocket.create_connection("wss://ws-api.runware.ai/v1")
-        # authenticate
-        auth_request = [
-            {
-                "taskType": "authentication",
-                "apiKey": key,
-            }
-        ]
-        ws.send(json.dumps(auth_request))
-        auth_response = ws.recv()
-        print("auth:" + auth_response)
-        # create request
-        image_request = [
-            {
-                "taskType": "imageInference",
-                "taskUUID": str(uuid.uuid4()), # create a random uuidv4
-                "outputType": "URL",
-                "outputFormat": "PNG",
-                "positivePrompt": positive_prompt,
-                "negativePrompt": negative_prompt,  
-                "height": height,
-                "width": width,
-                "model": model_air,
-                "steps": steps,
-                "seed": seed,
-                "CFGScale": cfg,
-                "numberResults": 1
-            }
-        ]
-        
-        if loras is not None:
-            loras = json.loads(loras)
-            image_request[0].update(loras)
-
-        ws.send(json.dumps(image_request))
-        response = ws.recv()
-        print("runware response:" + response)
-        result = json.loads(response)
-        image_url = result['data'][0]['imageURL']
-        # Download the image
-        response = requests.get(image_url)
-        image = Image.open(io.BytesIO(response.content))
-        # Convert image to ComfyUI format
-        image = np.array(image).astype(np.float32) / 255.0
-        output_image = torch.from_numpy(image)[None,]
-        ws.close()
-        return (output_image,)
+    def generate_image(self, positive_prompt, negative_prompt, width, height, steps, api_key, seed, cfg, model_air, loras=None, output_format="png", output_quality=90):
+        backend, model_air, arguments = self.build_request(positive_prompt, negative_prompt, width, height, steps, api_key, seed, cfg, model_air, loras, output_format, output_quality)
+        return backend.generate(model_air, arguments, seed=seed)
+
+    def build_request(self, positive_prompt, negative_prompt, width, height, steps, api_key, seed, cfg, model_air, loras=None, output_format="png", output_quality=90):
+        backend = RunwareBackend(api_key)
+        loras = as_lora_stack(loras, "runware")
+        lora_resolver.validate(loras, backend)
+        arguments = {
+            "positivePrompt": positive_prompt,
+            "negativePrompt": negative_prompt,
+            "height": height,
+            "width": width,
+            "steps": steps,
+            "seed": seed,
+            "CFGScale": cfg,
+        }
+        arguments.update(output_format_args("runware", output_format, output_quality))
+        if loras.entries:
+            arguments.update(loras.arguments())
+        return backend, model_air, arguments
 
 class FalFluxAPI:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
                 "prompt": ("STRING", {"multiline": True}),
-                "endpoint": (["schnell (4+ steps)", "dev (25+ steps)", "pro 1.1", "realism (25+ steps)", "pro (25+ steps)",],),
-                "width": ("INT", {"default": 1024, "min": 256, "max": 2048, "step": 16, "forceInput": False}),
-                "height": ("INT", {"default": 1024, "min": 256, "max": 2048, "step": 16, "forceInput": False}),
-                "steps": ("INT", {"default": 4, "min": 1, "max": 50}),
+                "endpoint": (list(cls.MODELS),),
+                "width": ("INT", endpoint_schemas.widget(cls.MODELS.values(), "image_size.width", default=1024, step=16, forceInput=False)),
+                "height": ("INT", endpoint_schemas.widget(cls.MODELS.values(), "image_size.height", default=1024, step=16, forceInput=False)),
+                "steps": ("INT", endpoint_schemas.widget(cls.MODELS.values(), "num_inference_steps", default=4)),
                 "api_key": (api_keys,),
                 "seed": ("INT", {"default": 1337, "min": 1, "max": 16777215}),
-                "cfg_dev_and_pro": ("FLOAT", {"default": 3.5, "min": 0, "max": 20, "step": 0.5, "forceInput": False}),
+                "cfg_dev_and_pro": ("FLOAT", endpoint_schemas.widget(cls.MODELS.values(), "guidance_scale", default=3.5, step=0.5, forceInput=False)),
+            },
+            "optional": {
+                "output_format": (OUTPUT_FORMATS,),
+                "output_quality": ("INT", {"default": 90, "min": 1, "max": 100}),
+                "realtime_schnell": ("BOOLEAN", {"default": False,}),
+                "stream": ("BOOLEAN", {"default": False,}),
             },
         }
+
+    MODELS = {
+        "schnell (4+ steps)": "fal-ai/flux/schnell",
+        "dev (25+ steps)": "fal-ai/flux/dev",
+        "pro 1.1": "fal-ai/flux-pro/v1.1",
+        "realism (25+ steps)": "fal-ai/flux-realism",
+        "pro (25+ steps)": "fal-ai/flux-pro",
+        }
     
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "CLOUD_IMAGE_BYTES",)
     FUNCTION = "generate_image"
     CATEGORY = "ComfyCloudAPIs"
 
-    def generate_image(self, prompt, endpoint, width, height, steps, api_key, seed, cfg_dev_and_pro):
-        #prevent too many steps error
-        if endpoint == "schnell (4+ steps)" and steps > 8:
-            steps = 8
-        #set endpoint
-        models = {
-            "schnell (4+ steps)": "fal-ai/flux/schnell",
-            "pro (25+ steps)": "fal-ai/flux-pro",
-            "realism (25+ steps)": "fal-ai/flux-realism",
-            "pro 1.1": "fal-ai/flux-pro/v1.1",
-            }
-        endpoint = models.get(endpoint, "fal-ai/flux/dev")
-        #Set api key
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(os.path.join(current_dir, "keys"), api_key), 'r', encoding='utf-8') as file:
-            key = file.read()
-        os.environ["FAL_KEY"] = key
-        handler = fal_client.submit(
-        endpoint,
-        arguments={
+    def generate_image(self, prompt, endpoint, width, height, steps, api_key, seed, cfg_dev_and_pro, output_format="png", output_quality=90, realtime_schnell=False, stream=False):
+        backend, endpoint, arguments = self.build_request(prompt, endpoint, width, height, steps, api_key, seed, cfg_dev_and_pro, output_format, output_quality, realtime_schnell, stream)
+        return backend.generate(endpoint, arguments, seed=seed)
+
+    def build_request(self, prompt, endpoint, width, height, steps, api_key, seed, cfg_dev_and_pro, output_format="png", output_quality=90, realtime_schnell=False, stream=False):
+        #set endpoint, per-model limits like schnell's step cap come from the endpoint schema
+        endpoint = self.MODELS.get(endpoint, "fal-ai/flux/dev")
+        mode = "queue"
+        if realtime_schnell and endpoint == "fal-ai/flux/schnell":
+            mode = "realtime"
+        elif stream:
+            mode = "stream"
+        backend = FalBackend(api_key, mode=mode)
+        arguments = {
             "prompt": prompt,
             "seed": seed,
             "guidance_scale": cfg_dev_and_pro,
@@ -783,22 +1704,13 @@ class FalFluxAPI:
             "num_inference_steps": steps,
             "enable_safety_checker": False,
             "num_images": 1,}  #Hardcoded to 1 for now
-        )
-        result = handler.get()
-        image_url = result['images'][0]['url']
-        #Download the image
-        response = requests.get(image_url)
-        image = Image.open(io.BytesIO(response.content))
-        #make image more comfy
-        image = np.array(image).astype(np.float32) / 255.0
-        output_image = torch.from_numpy(image)[None,]
-        return (output_image,)
+        arguments.update(output_format_args("fal", output_format, output_quality))
+        return backend, endpoint, arguments
 
 class ReplicateFluxAPI:
     @classmethod
     def INPUT_TYPES(cls):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        api_keys = [f for f in os.listdir(os.path.join(current_dir, "keys")) if f.endswith('.txt')]
+        api_keys = api_key_files()
         return {
             "required": {
                 "prompt": ("STRING", {"multiline": True}),
@@ -806,47 +1718,87 @@ class ReplicateFluxAPI:
                 "aspect_ratio": (["1:1", "16:9", "21:9", "2:3", "3:2", "4:5", "5:4", "9:16", "9:21"],),
                 "api_key": (api_keys,),
                 "seed": ("INT", {"default": 1337, "min": 1, "max": 16777215}),
-                "cfg_dev_and_pro": ("FLOAT", {"default": 3.5, "min": 1, "max": 10, "step": 0.5, "forceInput": False}),
-                "steps_pro": ("INT", {"default": 25, "min": 1, "max": 50}),
-                "creativity_pro": ("INT", {"default": 2, "min": 1, "max": 4}),
+                "cfg_dev_and_pro": ("FLOAT", endpoint_schemas.widget(cls.MODELS.values(), "guidance", default=3.5, step=0.5, forceInput=False)),
+                "steps_pro": ("INT", endpoint_schemas.widget(cls.MODELS.values(), "steps", default=25)),
+                "creativity_pro": ("INT", endpoint_schemas.widget(cls.MODELS.values(), "interval", default=2)),
+            },
+            "optional": {
+                "output_format": (OUTPUT_FORMATS,),
+                "output_quality": ("INT", {"default": 90, "min": 1, "max": 100}),
             },
         }
     
-    RETURN_TYPES = ("IMAGE",)
+    MODELS = {
+        "schnell": "black-forest-labs/flux-schnell",
+        "dev": "black-forest-labs/flux-dev",
+        "pro": "black-forest-labs/flux-pro",
+    }
+
+    RETURN_TYPES = ("IMAGE", "CLOUD_IMAGE_BYTES",)
     FUNCTION = "generate_image"
     CATEGORY = "ComfyCloudAPIs"
 
-    def generate_image(self, prompt, model, aspect_ratio, api_key, seed, cfg_dev_and_pro, steps_pro, creativity_pro,):
+    def generate_image(self, prompt, model, aspect_ratio, api_key, seed, cfg_dev_and_pro, steps_pro, creativity_pro, output_format="png", output_quality=90):
+        backend, model, input = self.build_request(prompt, model, aspect_ratio, api_key, seed, cfg_dev_and_pro, steps_pro, creativity_pro, output_format, output_quality)
+        return backend.generate(model, input, seed=seed)
+
+    def build_request(self, prompt, model, aspect_ratio, api_key, seed, cfg_dev_and_pro, steps_pro, creativity_pro, output_format="png", output_quality=90):
         #set endpoint
-        models = {
-            "schnell": "black-forest-labs/flux-schnell",
-            "pro": "black-forest-labs/flux-pro",
-        }
-        model = models.get(model, "black-forest-labs/flux-dev")
-        #Set api key
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(os.path.join(current_dir, "keys"), api_key), 'r', encoding='utf-8') as file:
-            key = file.read()
-        os.environ["REPLICATE_API_TOKEN"] = key
+        model = self.MODELS.get(model, "black-forest-labs/flux-dev")
+        backend = ReplicateBackend(api_key)
         #make request
         input={
             "prompt": prompt,
             "steps": steps_pro,
             "seed": seed,
             "disable_safety_checker": True,
-            "output_format": "png",
             "safety_tolerance": 5, #lowest value
             "aspect_ratio": aspect_ratio,
             "guidance": cfg_dev_and_pro,
             "interval": creativity_pro,}  
-        output = replicate.run(model, input=input)
-        image_url = output[0] if isinstance(output, list) else output #replicate started returning a different format, this works for both
-        response = requests.get(image_url)
-        image = Image.open(io.BytesIO(response.content))
-        #make image more comfy
-        image = np.array(image).astype(np.float32) / 255.0
-        output_image = torch.from_numpy(image)[None,]
-        return (output_image,)
+        input.update(output_format_args("replicate", output_format, output_quality))
+        return backend, model, input
+
+class SaveCloudImageBytes:
+    def __init__(self):
+        self.output_dir = folder_paths.get_output_directory()
+        self.type = "output"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image_bytes": ("CLOUD_IMAGE_BYTES", {"forceInput": True,}),
+                "filename_prefix": ("STRING", {"default": "ComfyCloudAPIs"}),
+            },
+            "hidden": {
+                "prompt": "PROMPT",
+                "extra_pnginfo": "EXTRA_PNGINFO",
+            },
+        }
+
+    RETURN_TYPES = ()
+    FUNCTION = "save_images"
+    OUTPUT_NODE = True
+    CATEGORY = "ComfyCloudAPIs"
+
+    def save_images(self, image_bytes, filename_prefix, prompt=None, extra_pnginfo=None):
+        full_output_folder, filename, counter, subfolder, filename_prefix = folder_paths.get_save_image_path(filename_prefix, self.output_dir)
+        data = image_bytes["data"]
+        extension = image_bytes["format"]
+        #like SaveImage, --disable-metadata leaves the file exactly as downloaded
+        if not args.disable_metadata:
+            fields = {"cloud_api": json.dumps(image_bytes["metadata"])}
+            if prompt is not None:
+                fields["prompt"] = json.dumps(prompt)
+            if extra_pnginfo is not None:
+                for key in extra_pnginfo:
+                    fields[key] = json.dumps(extra_pnginfo[key])
+            data = embed_metadata(data, extension, fields)
+        file = f"{filename}_{counter:05}_.{extension}"
+        with open(os.path.join(full_output_folder, file), 'wb') as output:
+            output.write(data)
+        return {"ui": {"images": [{"filename": file, "subfolder": subfolder, "type": self.type}]}}
 
 NODE_CLASS_MAPPINGS = {
     "FalFluxAPI": FalFluxAPI,
@@ -854,6 +1806,7 @@ NODE_CLASS_MAPPINGS = {
     "FluxResolutionPresets": FluxResolutionPresets,
     "FalAuraFlowAPI": FalAuraFlowAPI,
     "FalFluxI2IAPI": FalFluxI2IAPI,
+    "FalFluxTiledRefineAPI": FalFluxTiledRefineAPI,
     "FalSoteDiffusionAPI": FalSoteDiffusionAPI,
     "FalStableCascadeAPI": FalStableCascadeAPI,
     "FalLLaVAAPI": FalLLaVAAPI,
@@ -862,6 +1815,7 @@ NODE_CLASS_MAPPINGS = {
     "FalAddLora": FalAddLora,
     "RunWareAPI": RunWareAPI,
     "RunwareAddLora": RunwareAddLora,
+    "SaveCloudImageBytes": SaveCloudImageBytes,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
@@ -870,6 +1824,7 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "FluxResolutionPresets": "FluxResolutionPresets",
     "FalAuraFlowAPI": "FalAuraFlowAPI",
     "FalFluxI2IAPI": "FalFluxI2IAPI",
+    "FalFluxTiledRefineAPI": "FalFluxTiledRefineAPI",
     "FalSoteDiffusionAPI": "FalSoteDiffusionAPI",
     "FalStableCascadeAPI": "FalStableCascadeAPI",
     "FalLLaVAAPI": "FalLLaVAAPI",
@@ -877,4 +1832,9 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "FalAddLora": "FalAddLora",
     "RunWareAPI": "RunWareAPI",
     "RunwareAddLora": "RunwareAddLora",
-}
\ No newline at end of file
+    "SaveCloudImageBytes": "Save Cloud Image (original bytes)",
+}
+
+#submit constant-input cloud nodes as soon as a prompt is queued (opt-in, see README)
+if hasattr(getattr(PromptServer, "instance", None), "add_on_prompt_handler"):
+    PromptServer.instance.add_on_prompt_handler(speculate_prompt)
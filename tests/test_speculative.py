@@ -0,0 +1,57 @@
+"""Speculative job keys must match between queue time and run time.
+
+Needs ComfyUI on the path (run from the ComfyUI root, e.g. python -m pytest custom_nodes/ComfyUI-Cloud-APIs/tests).
+"""
+import importlib.util
+import os
+import pytest
+
+pytest.importorskip("comfy")
+pytest.importorskip("server")
+
+NODES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nodes.py")
+
+
+@pytest.fixture(scope="module")
+def nodes():
+    spec = importlib.util.spec_from_file_location("cloud_api_nodes", NODES_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+RUNWARE_INPUTS = {
+    "positive_prompt": "a cat", "negative_prompt": "", "width": 1024, "height": 1024, "steps": 20,
+    "api_key": "nokey.txt", "seed": 1337, "cfg": 7, "model_air": "runware:100@1",
+}
+FAL_FLUX_INPUTS = {
+    "prompt": "a cat", "endpoint": "dev (25+ steps)", "width": 1024, "height": 1024, "steps": 25,
+    "api_key": "nokey.txt", "seed": 1337, "cfg_dev_and_pro": 3,
+}
+
+
+@pytest.mark.parametrize("class_name, queued, float_input", [
+    ("RunWareAPI", RUNWARE_INPUTS, "cfg"),
+    ("FalFluxAPI", FAL_FLUX_INPUTS, "cfg_dev_and_pro"),
+])
+def test_int_literal_for_float_widget_claims_parked_job(nodes, class_name, queued, float_input):
+    node_class = nodes.NODE_CLASS_MAPPINGS[class_name]
+    #what the frontend queues: a whole-number FLOAT widget as a JSON int
+    backend, endpoint, arguments = node_class().build_request(**nodes.cast_widget_inputs(node_class, queued))
+    #what the node receives after ComfyUI's validation
+    run_inputs = dict(queued, **{float_input: float(queued[float_input])})
+    run_backend, run_endpoint, run_arguments = node_class().build_request(**run_inputs)
+    assert backend.job_key(endpoint, arguments) == run_backend.job_key(run_endpoint, run_arguments)
+
+
+def test_job_key_ignores_int_float_spelling(nodes):
+    backend, endpoint, arguments = nodes.RunWareAPI().build_request(**RUNWARE_INPUTS)
+    _, _, float_arguments = nodes.RunWareAPI().build_request(**dict(RUNWARE_INPUTS, cfg=7.0))
+    assert backend.job_key(endpoint, arguments) == backend.job_key(endpoint, float_arguments)
+
+
+def test_cast_widget_inputs_follows_input_types(nodes):
+    cast = nodes.cast_widget_inputs(nodes.RunWareAPI, RUNWARE_INPUTS)
+    assert isinstance(cast["cfg"], float)
+    assert isinstance(cast["steps"], int)
+    assert cast["model_air"] == "runware:100@1"
@@ -0,0 +1,129 @@
+"""Local stand-in for fal's realtime websocket, for trying FalFluxAPI's realtime_schnell mode offline.
+
+Run it, then start ComfyUI with FAL_REALTIME_URL set to the printed address:
+
+    python tools/fal_realtime_stub.py --port 8765 --latency 0.2
+    FAL_REALTIME_URL=ws://127.0.0.1:8765 python main.py
+
+Every request is answered with a flat image coloured from the seed, inlined as a data URI like fal's sync_mode.
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import socketserver
+import struct
+import time
+from PIL import Image
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def read_exact(stream, size):
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            raise ConnectionError("client went away")
+        data += chunk
+    return data
+
+
+def read_frame(stream):
+    first, second = read_exact(stream, 2)
+    opcode = first & 0x0f
+    length = second & 0x7f
+    if length == 126:
+        length = struct.unpack(">H", read_exact(stream, 2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", read_exact(stream, 8))[0]
+    mask = read_exact(stream, 4) if second & 0x80 else None
+    payload = read_exact(stream, length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def write_frame(stream, opcode, payload):
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 65536:
+        header += bytes([126]) + struct.pack(">H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack(">Q", len(payload))
+    stream.write(header + payload)
+    stream.flush()
+
+
+def fake_result(arguments):
+    size = arguments.get("image_size", {})
+    width, height = size.get("width", 1024), size.get("height", 1024)
+    seed = arguments.get("seed", 0)
+    color = (seed * 67 % 256, seed * 131 % 256, seed * 197 % 256)
+    jpeg = arguments.get("output_format") == "jpeg"
+    buffered = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffered, format="JPEG" if jpeg else "PNG")
+    content_type = "image/jpeg" if jpeg else "image/png"
+    url = f"data:{content_type};base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}"
+    return {
+        "images": [{"url": url, "width": width, "height": height, "content_type": content_type}],
+        "seed": seed,
+        "prompt": arguments.get("prompt", ""),
+        "timings": {"inference": 0.0},
+    }
+
+
+class RealtimeHandler(socketserver.StreamRequestHandler):
+    latency = 0.0
+
+    def handle(self):
+        headers = {}
+        while True:
+            line = self.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.wfile.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            + f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        self.wfile.flush()
+        try:
+            while True:
+                opcode, payload = read_frame(self.rfile)
+                if opcode == 0x8:
+                    write_frame(self.wfile, 0x8, payload[:2])
+                    return
+                if opcode == 0x9:
+                    write_frame(self.wfile, 0xa, payload)
+                    continue
+                if opcode not in (0x1, 0x2):
+                    continue
+                time.sleep(self.latency)
+                result = fake_result(json.loads(payload))
+                write_frame(self.wfile, 0x1, json.dumps(result, separators=(",", ":")).encode("utf-8"))
+        except ConnectionError:
+            return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering each request")
+    args = parser.parse_args()
+    RealtimeHandler.latency = args.latency
+    socketserver.ThreadingTCPServer.allow_reuse_address = True #restartable while old client sockets linger
+    server = socketserver.ThreadingTCPServer((args.host, args.port), RealtimeHandler)
+    server.daemon_threads = True
+    print(f"fal realtime stub listening on ws://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
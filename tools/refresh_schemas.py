@@ -0,0 +1,84 @@
+"""Refresh the bundled endpoint schema snapshot (schemas/endpoints.json) from the providers.
+
+fal endpoints are read from their public OpenAPI documents and replicate models from the model API, which needs a token:
+
+    REPLICATE_API_TOKEN=r8_... python tools/refresh_schemas.py
+
+Endpoints that can't be fetched (and runware, which publishes no schema) keep their current snapshot entry.
+"""
+import argparse
+import json
+import os
+import requests
+
+SNAPSHOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schemas", "endpoints.json")
+FAL_OPENAPI_URL = "https://fal.ai/api/openapi/queue/openapi.json?endpoint_id={endpoint}"
+REPLICATE_MODEL_URL = "https://api.replicate.com/v1/models/{endpoint}"
+KEPT_FIELDS = ("type", "minimum", "maximum", "multipleOf", "enum")
+
+
+def resolve(schema, components):
+    if "$ref" in schema:
+        return resolve(components[schema["$ref"].rsplit("/", 1)[-1]], components)
+    if "allOf" in schema and len(schema["allOf"]) == 1:
+        return resolve(dict(schema["allOf"][0], **{k: v for k, v in schema.items() if k != "allOf"}), components)
+    if "anyOf" in schema:
+        #fal offers presets or an explicit object for sizes, the nodes always send the object
+        options = [resolve(option, components) for option in schema["anyOf"]]
+        return next((option for option in options if option.get("type") == "object"), options[0])
+    return schema
+
+
+def reduce(schema, components):
+    """Keep only the parts of a JSON schema the node-side validator understands."""
+    schema = resolve(schema, components)
+    reduced = {key: schema[key] for key in KEPT_FIELDS if key in schema}
+    if "properties" in schema:
+        reduced["properties"] = {name: reduce(prop, components) for name, prop in schema["properties"].items()}
+    if schema.get("required"):
+        reduced["required"] = schema["required"]
+    return reduced
+
+
+def fetch_fal(endpoint):
+    document = requests.get(FAL_OPENAPI_URL.format(endpoint=endpoint), timeout=30).json()
+    components = document["components"]["schemas"]
+    body = document["paths"][f"/{endpoint}"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    return reduce(body, components)
+
+
+def fetch_replicate(endpoint, token):
+    response = requests.get(REPLICATE_MODEL_URL.format(endpoint=endpoint), headers={"Authorization": f"Bearer {token}"}, timeout=30)
+    response.raise_for_status()
+    components = response.json()["latest_version"]["openapi_schema"]["components"]["schemas"]
+    return reduce(components["Input"], components)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snapshot", default=SNAPSHOT)
+    args = parser.parse_args()
+    with open(args.snapshot, "r", encoding="utf-8") as file:
+        snapshot = json.load(file)
+    token = os.environ.get("REPLICATE_API_TOKEN")
+    for endpoint in snapshot:
+        try:
+            if endpoint.startswith("fal-ai/"):
+                snapshot[endpoint] = fetch_fal(endpoint)
+            elif endpoint.startswith("runware/"):
+                continue
+            elif token:
+                snapshot[endpoint] = fetch_replicate(endpoint, token)
+            else:
+                print(f"kept {endpoint}: set REPLICATE_API_TOKEN to refresh it")
+                continue
+            print(f"refreshed {endpoint}")
+        except (requests.RequestException, KeyError, ValueError) as e:
+            print(f"kept {endpoint}: {e}")
+    with open(args.snapshot, "w", encoding="utf-8") as file:
+        json.dump(snapshot, file, indent=2)
+        file.write("\n")
+
+
+if __name__ == "__main__":
+    main()